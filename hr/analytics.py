@@ -9,6 +9,8 @@ from pathlib import Path
 from collections import defaultdict
 from statistics import median as _median
 
+import numpy as np
+
 from .database import get_connection, DEFAULT_DB_PATH
 
 
@@ -51,6 +53,28 @@ def get_age_category(age: int, categories: list[tuple[int, int, str]] | None = N
     return 'Ukjent'
 
 
+def get_age_categories(ages, categories: list[tuple[int, int, str]] | None = None) -> list[str]:
+    """
+    Vektorisert get_age_category: alderskategori for hver alder i ages.
+    Kategoriene overlapper ikke (validert ved lagring), så hver alder slås opp
+    med searchsorted på min_alder og sjekkes mot maks_alder — hull gir 'Ukjent'.
+    """
+    cats = sorted(categories or _DEFAULT_AGE_CATEGORIES)
+    ages_arr = np.asarray(ages, dtype=float)
+    mins = np.array([c[0] for c in cats], dtype=float)
+    maxs = np.array([c[1] for c in cats], dtype=float)
+    labels = np.array([c[2] for c in cats] + ['Ukjent'], dtype=object)
+
+    idx = np.searchsorted(mins, ages_arr, side='right') - 1
+    inside = (idx >= 0) & (ages_arr <= maxs[idx.clip(0)])
+    return labels[np.where(inside, idx, len(cats))].tolist()
+
+
+# Grenser (år) for ansiennitetskategoriene i tenure_distribution
+_TENURE_BINS = np.array([1, 2, 5, 10])
+_TENURE_LABELS = ('Under 1 år', '1-2 år', '2-5 år', '5-10 år', 'Over 10 år')
+
+
 class HRAnalytics:
     """Analyseklasse for HR-data."""
     
@@ -119,9 +143,8 @@ class HRAnalytics:
         distribution = {cat[2]: 0 for cat in cats}
         distribution['Ukjent'] = 0
         
-        for row in rows:
-            category = get_age_category(row['alder'], cats)
-            distribution[category] = distribution.get(category, 0) + 1
+        for label in get_age_categories([row['alder'] for row in rows], cats):
+            distribution[label] = distribution.get(label, 0) + 1
         
         return distribution
     
@@ -141,9 +164,9 @@ class HRAnalytics:
         cats = self._age_categories()
         result = defaultdict(lambda: {cat[2]: 0 for cat in cats})
         
-        for row in rows:
+        categories = get_age_categories([row['alder'] for row in rows], cats)
+        for row, category in zip(rows, categories):
             country = row['arbeidsland'] or 'Ukjent land'
-            category = get_age_category(row['alder'], cats)
             result[country][category] += 1
         
         return dict(result)
@@ -358,26 +381,14 @@ class HRAnalytics:
             {where}
         """)
         
-        categories = {
-            'Under 1 år': 0,
-            '1-2 år': 0,
-            '2-5 år': 0,
-            '5-10 år': 0,
-            'Over 10 år': 0,
-        }
-        
-        for row in rows:
-            tenure = row['tenure']
-            if tenure < 1:
-                categories['Under 1 år'] += 1
-            elif tenure < 2:
-                categories['1-2 år'] += 1
-            elif tenure < 5:
-                categories['2-5 år'] += 1
-            elif tenure < 10:
-                categories['5-10 år'] += 1
-            else:
-                categories['Over 10 år'] += 1
+        tenures = np.array([row['tenure'] for row in rows], dtype=float)
+        # Ugyldig startdato (JULIANDAY gir NULL → NaN) hoppes over — ellers ville
+        # digitize lagt NaN i 'Over 10 år'. Startdato fram i tid havner i 'Under 1 år'.
+        tenures = tenures[~np.isnan(tenures)]
+        counts = np.bincount(
+            np.digitize(tenures, _TENURE_BINS), minlength=len(_TENURE_LABELS)
+        )
+        categories = {label: int(n) for label, n in zip(_TENURE_LABELS, counts)}
         
         return categories
     
@@ -866,8 +877,8 @@ class HRAnalytics:
         
         cats = self._age_categories()
         by_category = defaultdict(list)
-        for row in rows:
-            cat = get_age_category(row['alder'], cats)
+        categories = get_age_categories([row['alder'] for row in rows], cats)
+        for row, cat in zip(rows, categories):
             by_category[cat].append(row['lonn'])
         
         return {
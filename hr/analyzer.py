@@ -6,8 +6,8 @@ All bruker-input valideres mot whitelists — ingen rå SQL fra brukeren.
 
 from typing import Optional, Union
 from pathlib import Path
-from collections import defaultdict
-from statistics import median as _median
+
+import numpy as np
 
 from .database import get_connection, DEFAULT_DB_PATH
 from .analytics import load_age_categories
@@ -63,6 +63,9 @@ DIMENSIONS: dict[str, tuple[Optional[str], str]] = {
 }
 
 # SQL CASE-uttrykk for aldersgrupper (bygges dynamisk fra DB)
+# Merk: aldersgruppe/tenure_gruppe beregnes bevisst i spørringen og ikke som
+# genererte kolonner — kategoriene kan endres i alderskategorier-tabellen, og
+# ansiennitet avhenger av date('now'), som SQLite ikke tillater i GENERATED.
 def _build_age_case_expr(db_path: Optional[Path] = None) -> str:
     """Bygg SQL CASE-uttrykk for aldersgrupper fra DB-kategorier."""
     cats = load_age_categories(db_path)
@@ -95,6 +98,19 @@ FILTERS: dict[str, str] = {
     k: v[0] for k, v in DIMENSIONS.items() if v[0] is not None
 }
 
+# Frosne nøkkelsett for validering i build_analysis_query
+_METRIC_KEYS = frozenset(METRICS)
+_DIMENSION_KEYS = frozenset(DIMENSIONS)
+_FILTER_KEYS = frozenset(FILTERS)
+_SALARY_METRICS = frozenset(
+    {"avg_salary", "min_salary", "max_salary", "median_salary", "sum_salary"}
+)
+
+
+# Cache for ferdigbygde SQL-strenger per spørringsform (se build_analysis_query)
+_SQL_TEMPLATES: dict[tuple, str] = {}
+_SQL_TEMPLATES_MAX = 512
+
 
 def _resolve_dimension(dim_key: str, db_path: Optional[Path] = None) -> str:
     """
@@ -153,19 +169,19 @@ def build_analysis_query(
     date_as_of = _validate_date_as_of(date_as_of)
 
     # Valider metrikk
-    if metric not in METRICS:
+    if metric not in _METRIC_KEYS:
         raise ValueError(
             f"Ugyldig metrikk: '{metric}'. Tillatte: {', '.join(METRICS.keys())}"
         )
 
     # Valider group_by
-    if group_by != "alle" and group_by not in DIMENSIONS:
+    if group_by != "alle" and group_by not in _DIMENSION_KEYS:
         raise ValueError(
             f"Ugyldig gruppering: '{group_by}'. Tillatte: alle, {', '.join(DIMENSIONS.keys())}"
         )
 
     # Valider split_by
-    if split_by is not None and split_by not in DIMENSIONS:
+    if split_by is not None and split_by not in _DIMENSION_KEYS:
         raise ValueError(
             f"Ugyldig inndeling: '{split_by}'. Tillatte: {', '.join(DIMENSIONS.keys())}"
         )
@@ -188,8 +204,7 @@ def build_analysis_query(
         where_parts.append("er_aktiv = 1")
 
     # Metrikker som krever lønn trenger lonn IS NOT NULL
-    salary_metrics = {"avg_salary", "min_salary", "max_salary", "median_salary", "sum_salary"}
-    if metric in salary_metrics:
+    if metric in _SALARY_METRICS:
         where_parts.append("lonn IS NOT NULL")
 
     # Metrikker som krever alder trenger alder IS NOT NULL
@@ -214,7 +229,7 @@ def build_analysis_query(
 
     if filters:
         for key, value in filters.items():
-            if key not in FILTERS:
+            if key not in _FILTER_KEYS:
                 raise ValueError(
                     f"Ugyldig filter: '{key}'. Tillatte: {', '.join(FILTERS.keys())}"
                 )
@@ -234,62 +249,86 @@ def build_analysis_query(
                 where_parts.append(f"{col} = ?")
                 params.append(value)
 
-    # Bygg SQL
+    # Ferdig SQL for samme form (metrikk, dimensjoner, WHERE) gjenbrukes —
+    # bare params varierer mellom kall
+    tenure_date = date_as_of if (date_as_of and metric == "avg_tenure") else None
+    age_expr = (
+        _build_age_case_expr(db_path)
+        if "aldersgruppe" in (group_by, split_by) else None
+    )
+    key = (metric, group_by, split_by, tuple(where_parts), tenure_date, age_expr)
+    sql = _SQL_TEMPLATES.get(key)
+    if sql is None:
+        sql = _assemble_sql(metric, group_by, split_by, where_parts, tenure_date, age_expr)
+        if len(_SQL_TEMPLATES) >= _SQL_TEMPLATES_MAX:
+            _SQL_TEMPLATES.clear()
+        _SQL_TEMPLATES[key] = sql
+
+    return sql, tuple(params)
+
+
+def _assemble_sql(
+    metric: str,
+    group_by: str,
+    split_by: Optional[str],
+    where_parts: list[str],
+    tenure_date: Optional[str],
+    age_expr: Optional[str],
+) -> str:
+    """Sett sammen SQL-teksten for en validert spørringsform."""
     agg_func = METRICS[metric][0]
 
     # Når date_as_of er satt, bruk snapshot-datoen i stedet for date('now')
     # for ansiennitetsberegninger
-    if date_as_of and metric == "avg_tenure":
+    if tenure_date:
         agg_func = (
-            f"AVG(JULIANDAY(COALESCE(slutdato_ansettelse, '{date_as_of}')) "
+            f"AVG(JULIANDAY(COALESCE(slutdato_ansettelse, '{tenure_date}')) "
             f"- JULIANDAY(ansettelsens_startdato)) / 365.25"
         )
 
+    def resolve(dim_key: str) -> str:
+        if dim_key == "aldersgruppe":
+            return age_expr
+        return _resolve_dimension(dim_key)
+
     where_clause = f"WHERE {' AND '.join(where_parts)}" if where_parts else ""
 
     # Spesialhåndtering: metrikker med None som SQL (f.eks. median)
     # Henter rådata per gruppe i stedet for aggregat — beregnes i run_analysis()
     if agg_func is None:
         if group_by == "alle":
-            sql = f"SELECT lonn AS verdi FROM ansatte {where_clause}"
-            return sql, tuple(params)
+            return f"SELECT lonn AS verdi FROM ansatte {where_clause}"
 
-        group_expr = _resolve_dimension(group_by, db_path)
-        select_parts = [f"{group_expr} AS gruppe"]
+        select_parts = [f"{resolve(group_by)} AS gruppe"]
 
         if split_by:
-            split_expr = _resolve_dimension(split_by, db_path)
-            select_parts.append(f"{split_expr} AS inndeling")
+            select_parts.append(f"{resolve(split_by)} AS inndeling")
 
         select_parts.append("lonn AS verdi")
-        sql = (
+        return (
             f"SELECT {', '.join(select_parts)} "
             f"FROM ansatte "
             f"{where_clause} "
             f"ORDER BY gruppe"
         )
-        return sql, tuple(params)
 
     # Spesialhåndtering: "alle" = ingen GROUP BY, bare aggregering
     if group_by == "alle":
-        sql = f"SELECT {agg_func} AS verdi FROM ansatte {where_clause}"
-        return sql, tuple(params)
+        return f"SELECT {agg_func} AS verdi FROM ansatte {where_clause}"
 
-    group_expr = _resolve_dimension(group_by, db_path)
     group_alias = "gruppe"
 
-    select_parts = [f"{group_expr} AS {group_alias}"]
+    select_parts = [f"{resolve(group_by)} AS {group_alias}"]
     group_by_parts = [group_alias]
 
     if split_by:
-        split_expr = _resolve_dimension(split_by, db_path)
         split_alias = "inndeling"
-        select_parts.append(f"{split_expr} AS {split_alias}")
+        select_parts.append(f"{resolve(split_by)} AS {split_alias}")
         group_by_parts.append(split_alias)
 
     select_parts.append(f"{agg_func} AS verdi")
 
-    sql = (
+    return (
         f"SELECT {', '.join(select_parts)} "
         f"FROM ansatte "
         f"{where_clause} "
@@ -297,7 +336,15 @@ def build_analysis_query(
         f"ORDER BY {group_alias}"
     )
 
-    return sql, tuple(params)
+
+def _median(values: list[float]) -> float:
+    """Median via np.partition (O(n) utvalg i stedet for full sortering)."""
+    arr = np.asarray(values, dtype=float)
+    mid = arr.size // 2
+    if arr.size % 2:
+        return float(np.partition(arr, mid)[mid])
+    part = np.partition(arr, (mid - 1, mid))
+    return float((part[mid - 1] + part[mid]) / 2)
 
 
 def _compute_special_metric(
@@ -333,23 +380,15 @@ def _compute_special_metric(
         return {"meta": meta, "data": {"Alle": _round_value(result, metric)}}
 
     if split_by:
-        grouped: dict[str, dict[str, list[float]]] = {}
-        for row in rows:
-            gruppe, inndeling, verdi = row[0], row[1], row[2]
-            if verdi is None:
-                continue
-            if gruppe not in grouped:
-                grouped[gruppe] = {}
-            if inndeling not in grouped[gruppe]:
-                grouped[gruppe][inndeling] = []
-            grouped[gruppe][inndeling].append(verdi)
+        # Grupper én gang på (gruppe, inndeling) og pivoter først etterpå
+        grouped: dict[tuple, list[float]] = {}
+        for gruppe, inndeling, verdi in rows:
+            if verdi is not None:
+                grouped.setdefault((gruppe, inndeling), []).append(verdi)
 
         data: dict = {}
-        for gruppe, splits in grouped.items():
-            data[gruppe] = {
-                k: _round_value(_median(v), metric)
-                for k, v in splits.items() if v
-            }
+        for (gruppe, inndeling), values in grouped.items():
+            data.setdefault(gruppe, {})[inndeling] = _round_value(_median(values), metric)
         meta["total_groups"] = len(data)
     else:
         grouped_flat: dict[str, list[float]] = {}
@@ -445,14 +484,11 @@ def run_analysis(
 
     # Bygg data
     if split_by:
+        # SQL har allerede aggregert på (gruppe, inndeling) i én GROUP BY —
+        # her pivoteres bare de ferdige radene til nestet dict.
         data: dict = {}
-        for row in rows:
-            gruppe = row[0]
-            inndeling = row[1]
-            verdi = row[2]
-            if gruppe not in data:
-                data[gruppe] = {}
-            data[gruppe][inndeling] = _round_value(verdi, metric)
+        for gruppe, inndeling, verdi in rows:
+            data.setdefault(gruppe, {})[inndeling] = _round_value(verdi, metric)
         meta["total_groups"] = len(data)
     else:
         data = {}
@@ -494,21 +530,19 @@ def get_filter_values(
         where = ""
         base_params = []
 
-    result: dict[str, list[str]] = {}
-
-    for key, col in FILTERS.items():
-        if where:
-            sql = (
-                f"SELECT DISTINCT {col} FROM ansatte {where} "
-                f"AND {col} IS NOT NULL ORDER BY {col}"
-            )
-        else:
-            sql = (
-                f"SELECT DISTINCT {col} FROM ansatte "
-                f"WHERE {col} IS NOT NULL ORDER BY {col}"
-            )
-        cursor.execute(sql, base_params)
-        result[key] = [row[0] for row in cursor.fetchall()]
+    # Én UNION ALL-spørring for alle dimensjoner i stedet for én per kolonne
+    conditions = f"{where} AND" if where else "WHERE"
+    subqueries = [
+        f"SELECT '{key}' AS dim, {col} AS verdi FROM ansatte "
+        f"{conditions} {col} IS NOT NULL GROUP BY {col}"
+        for key, col in FILTERS.items()
+    ]
+    sql = " UNION ALL ".join(subqueries) + " ORDER BY dim, verdi"
+    cursor.execute(sql, base_params * len(subqueries))
+
+    result: dict[str, list[str]] = {key: [] for key in FILTERS}
+    for row in cursor.fetchall():
+        result[row[0]].append(row[1])
 
     conn.close()
     return result
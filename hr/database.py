@@ -3,6 +3,8 @@ Database-skjema og tilkoblingslogikk for HR-databasen.
 Håndterer SQLite-database for ansattdata.
 """
 
+import json
+import logging
 import sqlite3
 from pathlib import Path
 from datetime import date, datetime
@@ -13,14 +15,26 @@ import os
 _env_db_path = os.environ.get("DB_PATH")
 DEFAULT_DB_PATH = Path(_env_db_path) if _env_db_path else Path(__file__).parent.parent / "data" / "ansatte.db"
 
+logger = logging.getLogger(__name__)
+
+# Nøkkelen som definerer en duplikat-pin (i tillegg til eier: bruker_id eller profil_id)
+_PIN_KEY_SQL = "metric, group_by, COALESCE(split_by, ''), COALESCE(filters, ''), COALESCE(date_as_of, '')"
+
 
 def get_connection(db_path: Optional[Path] = None) -> sqlite3.Connection:
-    """Opprett tilkobling til databasen."""
+    """
+    Opprett tilkobling til databasen.
+    Støtter også SQLite-URIer (f.eks. 'file:navn?mode=memory&cache=shared').
+    """
     if db_path is None:
         db_path = DEFAULT_DB_PATH
     
-    conn = sqlite3.connect(str(db_path))
+    db_str = str(db_path)
+    conn = sqlite3.connect(db_str, uri=db_str.startswith("file:"))
     conn.row_factory = sqlite3.Row  # Gir dict-lignende rader
+    # WAL (settes i init_database) er trygt med synchronous=NORMAL
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
     return conn
 
 
@@ -124,6 +138,9 @@ def init_database(db_path: Optional[Path] = None) -> None:
     conn = get_connection(db_path)
     cursor = conn.cursor()
     
+    # WAL lar lesere jobbe parallelt med én skriver (lagres i databasefilen)
+    cursor.execute("PRAGMA journal_mode = WAL")
+    
     # Hovedtabell for ansatte
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS ansatte (
@@ -307,6 +324,41 @@ def init_database(db_path: Optional[Path] = None) -> None:
         except Exception:
             pass  # Kolonne finnes allerede
 
+    # Eldre pins har bare filter_dim/filter_val (filters-kolonnen kom senere).
+    # Fyll inn filters på samme format som create_pin, så de inngår i duplikatnøkkelen.
+    legacy = cursor.execute(
+        "SELECT id, filter_dim, filter_val FROM dashboard_pins "
+        "WHERE filters IS NULL AND filter_dim IS NOT NULL AND filter_val IS NOT NULL"
+    ).fetchall()
+    cursor.executemany(
+        "UPDATE dashboard_pins SET filters = ? WHERE id = ?",
+        [(json.dumps({dim: [val]}, ensure_ascii=False, sort_keys=True), pin_id)
+         for pin_id, dim, val in legacy],
+    )
+
+    # Unike indekser håndhever at samme graf ikke pinnes to ganger (per bruker
+    # for 'Mine grafer', per profil ellers). COALESCE fordi NULL ellers regnes
+    # som ulike verdier i en unik indeks. Finnes det allerede duplikater,
+    # slettes ingenting — indeksen hoppes over og duplikatene logges.
+    for index_name, owner, scope in [
+        ("ux_pins_personlig", "bruker_id", "profil_id IS NULL"),
+        ("ux_pins_profil", "profil_id", "profil_id IS NOT NULL"),
+    ]:
+        duplicates = cursor.execute(
+            f"SELECT GROUP_CONCAT(id) FROM dashboard_pins WHERE {scope} "
+            f"GROUP BY {owner}, {_PIN_KEY_SQL} HAVING COUNT(*) > 1"
+        ).fetchall()
+        if duplicates:
+            logger.error(
+                "dashboard_pins har duplikater (pin-id-er: %s); %s ble ikke opprettet",
+                "; ".join(row[0] for row in duplicates), index_name,
+            )
+            continue
+        cursor.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} "
+            f"ON dashboard_pins({owner}, {_PIN_KEY_SQL}) WHERE {scope}"
+        )
+
     # Legg til divisjon-kolonne i ansatte-tabellen (for eksisterende databaser)
     try:
         cursor.execute("ALTER TABLE ansatte ADD COLUMN divisjon TEXT")
@@ -321,6 +373,27 @@ def init_database(db_path: Optional[Path] = None) -> None:
     print(f"Database initialisert: {db_path or DEFAULT_DB_PATH}")
 
 
+def get_data_version(db_path: Optional[Path] = None) -> str:
+    """
+    Billig fingeravtrykk av datatilstanden, brukt til ETag og cache-nøkler.
+    Endres ved import (ny import_logg-rad, nye AUTOINCREMENT-id-er i ansatte),
+    ved nye alderskategorier og ved datoskifte (aktiv-status er datoavhengig).
+    """
+    conn = get_connection(db_path)
+    try:
+        row = conn.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM ansatte),
+                (SELECT MAX(id) FROM ansatte),
+                (SELECT MAX(id) FROM import_logg),
+                (SELECT MAX(id) FROM alderskategorier),
+                date('now')
+        """).fetchone()
+    finally:
+        conn.close()
+    return ":".join("" if v is None else str(v) for v in row)
+
+
 def reset_database(db_path: Optional[Path] = None) -> None:
     """Slett og opprett databasen på nytt. ADVARSEL: Sletter alle data!"""
     if db_path is None:
@@ -330,6 +403,12 @@ def reset_database(db_path: Optional[Path] = None) -> None:
         os.remove(db_path)
         print(f"Slettet eksisterende database: {db_path}")
     
+    # Fjern WAL-filer så de ikke blir liggende igjen for den nye databasen
+    for suffix in ("-wal", "-shm"):
+        side_file = Path(f"{db_path}{suffix}")
+        if side_file.exists():
+            os.remove(side_file)
+    
     init_database(db_path)
 
 
@@ -5,8 +5,12 @@ Provides a temporary SQLite database pre-populated with known test data,
 so every test runs against predictable, isolated data.
 """
 
+import json
+import shutil
 import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 from datetime import date, datetime
 
 import pytest
@@ -121,40 +125,197 @@ def _compute_er_aktiv(slutdato: str | None) -> bool:
 
 def seed_employees(db_path: Path) -> None:
     """Insert test employees into the database."""
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-
     cols = EMPLOYEE_COLUMNS + ["er_aktiv", "kilde_fil"]
     placeholders = ", ".join(["?"] * len(cols))
     col_names = ", ".join(cols)
     sql = f"INSERT OR REPLACE INTO ansatte ({col_names}) VALUES ({placeholders})"
 
-    for emp in TEST_EMPLOYEES:
-        slutdato = emp[13]  # slutdato_ansettelse
-        er_aktiv = _compute_er_aktiv(slutdato)
-        values = list(emp) + [er_aktiv, "test_data.xlsx"]
-        cursor.execute(sql, values)
+    # emp[13] is slutdato_ansettelse
+    rows = [
+        list(emp) + [_compute_er_aktiv(emp[13]), "test_data.xlsx"]
+        for emp in TEST_EMPLOYEES
+    ]
+
+    conn = get_connection(db_path)
+    try:
+        conn.executemany(sql, rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def seed_pins(db_path, user_id: int, specs: list[dict]) -> list[int]:
+    """
+    Insert personal dashboard pins for user_id directly (no HTTP round-trip).
+    Each spec needs metric and group_by; sortering follows list order.
+    Returns the new pin ids in the same order.
+    """
+    conn = get_connection(db_path)
+    try:
+        ids = []
+        for sortering, spec in enumerate(specs):
+            cursor = conn.execute(
+                "INSERT INTO dashboard_pins "
+                "(bruker_id, metric, group_by, tittel, sortering) VALUES (?, ?, ?, ?, ?)",
+                (user_id, spec["metric"], spec["group_by"],
+                 spec.get("tittel", f"Pin {sortering}"), sortering),
+            )
+            ids.append(cursor.lastrowid)
+        conn.commit()
+        return ids
+    finally:
+        conn.close()
 
-    conn.commit()
-    conn.close()
+
+def read_pin(db_path, pin_id: int) -> dict | None:
+    """
+    Read one dashboard pin straight from the database, with filters decoded.
+    Returns None if the pin does not exist.
+    """
+    conn = get_connection(db_path)
+    try:
+        row = conn.execute("SELECT * FROM dashboard_pins WHERE id = ?", (pin_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    pin = dict(row)
+    pin["filters"] = json.loads(pin["filters"]) if pin["filters"] else None
+    return pin
 
 
 # ---------------------------------------------------------------------------
 # Fixtures
 # ---------------------------------------------------------------------------
 
-@pytest.fixture
-def test_db(tmp_path) -> Path:
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "readonly: test never writes to its database and may share a read-only copy",
+    )
+
+
+@pytest.fixture(scope="session")
+def golden_db(tmp_path_factory) -> Path:
     """
-    Create a temporary database with known test data.
-    Returns the Path to the database file.
+    Seeded template database, built once per session.
+    Never hand it to a test directly — use copy_golden_db() or a fixture below.
+    Under pytest-xdist every worker is its own session with its own
+    tmp_path_factory base directory, so each worker seeds and copies a
+    private template.
     """
-    db_path = tmp_path / "test_ansatte.db"
+    db_path = tmp_path_factory.mktemp("golden") / "template.db"
     init_database(db_path)
     seed_employees(db_path)
     return db_path
 
 
+def copy_golden_db(golden_db: Path, db_path: Path) -> Path:
+    """Copy the template database to db_path (much cheaper than re-seeding)."""
+    shutil.copyfile(golden_db, db_path)
+    return db_path
+
+
+@contextmanager
+def memory_copy(golden_db: Path, name: str) -> Iterator[str]:
+    """
+    Load the template database into a shared-cache in-memory database.
+    Yields a SQLite URI usable wherever a db_path is accepted; an anchor
+    connection keeps the database alive until the context exits.
+    """
+    uri = f"file:{name}?mode=memory&cache=shared"
+    anchor = get_connection(uri)
+    source = get_connection(golden_db)
+    source.backup(anchor)
+    source.close()
+    try:
+        yield uri
+    finally:
+        anchor.close()
+
+
+@pytest.fixture
+def test_db(tmp_path, golden_db) -> Path:
+    """
+    Create a temporary database with known test data.
+    Returns the Path to the database file.
+    """
+    return copy_golden_db(golden_db, tmp_path / "test_ansatte.db")
+
+
+@pytest.fixture(scope="module")
+def module_db(tmp_path_factory, golden_db) -> Path:
+    """
+    Seeded database shared by all tests in a module.
+    Only for read-only tests — mutations leak between tests.
+    """
+    return copy_golden_db(
+        golden_db, tmp_path_factory.mktemp("module_db") / "test_ansatte.db"
+    )
+
+
+@pytest.fixture(scope="module")
+def readonly_db(module_db) -> str:
+    """
+    SQLite URI opening module_db read-only (mode=ro), for tests marked
+    @pytest.mark.readonly. Any write fails loudly instead of leaking state.
+    """
+    return f"{module_db.as_uri()}?mode=ro"
+
+
+@pytest.fixture(scope="module")
+def memory_db(request, golden_db) -> str:
+    """
+    Seeded in-memory database (see memory_copy) shared by all tests in a module.
+    Only for read-only tests — mutations leak between tests.
+    """
+    name = request.module.__name__.replace(".", "_")
+    with memory_copy(golden_db, name) as uri:
+        yield uri
+
+
+@contextmanager
+def use_app_db(db_path) -> Iterator[None]:
+    """
+    Point the web app at db_path: swaps DEFAULT_DB_PATH (also the copy
+    imported by import_routes for /api/status) and swaps the shared
+    analytics instance. Everything is restored on exit.
+    """
+    import web.app as web_app_module
+    import web.routes.import_routes as import_routes_module
+
+    import hr.database as database_module
+
+    # Plain attribute swaps; mock.patch adds nothing here but per-test overhead
+    previous = (database_module.DEFAULT_DB_PATH,
+                import_routes_module.DEFAULT_DB_PATH,
+                web_app_module.analytics)
+    database_module.DEFAULT_DB_PATH = db_path
+    import_routes_module.DEFAULT_DB_PATH = db_path
+    web_app_module.analytics = HRAnalytics(db_path=db_path)
+    try:
+        yield
+    finally:
+        (database_module.DEFAULT_DB_PATH,
+         import_routes_module.DEFAULT_DB_PATH,
+         web_app_module.analytics) = previous
+
+
+@pytest.fixture(scope="session")
+def app_client(golden_db):
+    """
+    One TestClient, and thus one app startup (lifespan), for the whole session.
+    The lifespan runs against a private in-memory copy of the template; tests
+    repoint the client at their own database with use_app_db().
+    """
+    from fastapi.testclient import TestClient
+    import web.app as web_app_module
+
+    with memory_copy(golden_db, "session_app") as uri, use_app_db(uri):
+        with TestClient(web_app_module.app, raise_server_exceptions=False) as c:
+            yield c
+
+
 @pytest.fixture
 def analytics(test_db) -> HRAnalytics:
     """Return an HRAnalytics instance connected to the test database."""
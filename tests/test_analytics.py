@@ -16,6 +16,8 @@ from datetime import date
 
 import pytest
 
+from hr.analytics import get_age_category, get_age_categories
+
 
 # =========================================================================
 # Basic stats
@@ -81,6 +83,20 @@ class TestAgeDistribution:
         assert abs(total - 100.0) < 0.5  # should sum to ~100%
 
 
+class TestGetAgeCategories:
+
+    def test_matches_scalar_lookup(self):
+        ages = [0, 24, 25, 34, 44.5, 64, 65, 150, 151, -1]
+        assert get_age_categories(ages) == [get_age_category(a) for a in ages]
+
+    def test_gap_between_categories_is_unknown(self):
+        cats = [(0, 29, "Ung"), (40, 99, "Eldre")]
+        assert get_age_categories([20, 35, 50], cats) == ["Ung", "Ukjent", "Eldre"]
+
+    def test_empty_input(self):
+        assert get_age_categories([]) == []
+
+
 class TestAgeDistributionByCountry:
 
     def test_returns_countries(self, analytics):
@@ -274,6 +290,26 @@ class TestTenure:
         total = sum(dist.values())
         assert total == analytics.total_employees(active_only=True)
 
+    def test_distribution_skips_missing_start(self, test_db):
+        """NULL/unparseable start dates are skipped; a future start counts as 'Under 1 år'."""
+        from hr.analytics import HRAnalytics
+        from hr.database import get_connection
+
+        ha = HRAnalytics(db_path=test_db)
+        before = ha.tenure_distribution()
+
+        conn = get_connection(test_db)
+        conn.executemany(
+            "INSERT INTO ansatte (fornavn, ansettelsens_startdato, er_aktiv) VALUES (?, ?, 1)",
+            [("Null", None), ("Ugyldig", "ukjent"), ("Fremtid", "2999-01-01")],
+        )
+        conn.commit()
+        conn.close()
+
+        expected = dict(before)
+        expected["Under 1 år"] += 1  # Fremtid
+        assert ha.tenure_distribution() == expected
+
 
 # =========================================================================
 # Employment type
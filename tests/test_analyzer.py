@@ -8,7 +8,7 @@ og henting av filterverdier.
 import pytest
 
 from hr.analyzer import (
-    build_analysis_query, run_analysis, get_filter_values,
+    build_analysis_query, run_analysis, get_filter_values, _median,
     METRICS, DIMENSIONS, FILTERS, AGE_CASE_EXPR, TENURE_CASE_EXPR,
 )
 
@@ -201,6 +201,31 @@ class TestBuildQuery:
         sql, _ = build_analysis_query(metric="count", group_by="arbeidssted")
         assert "COALESCE(arbeidssted, 'Ukjent')" in sql
 
+    # --- SQL-cache ---
+
+    def test_same_shape_reuses_cached_sql(self):
+        """Samme spørringsform gir samme SQL-objekt; bare params varierer."""
+        sql1, params1 = build_analysis_query(
+            metric="count", group_by="avdeling", filters={"arbeidsland": "Norge"}
+        )
+        sql2, params2 = build_analysis_query(
+            metric="count", group_by="avdeling", filters={"arbeidsland": "Sverige"}
+        )
+        assert sql1 is sql2
+        assert params1 == ("Norge",)
+        assert params2 == ("Sverige",)
+
+    def test_tenure_snapshot_date_not_shared_in_cache(self):
+        """avg_tenure med ulike date_as_of gir ulik SQL (datoen ligger i uttrykket)."""
+        sql1, _ = build_analysis_query(
+            metric="avg_tenure", group_by="alle", date_as_of="2024-01-01"
+        )
+        sql2, _ = build_analysis_query(
+            metric="avg_tenure", group_by="alle", date_as_of="2025-01-01"
+        )
+        assert "'2024-01-01'" in sql1
+        assert "'2025-01-01'" in sql2
+
 
 # ===========================================================================
 # run_analysis — kjøring mot testdata
@@ -255,30 +280,16 @@ class TestRunAnalysis:
             for split_key, val in splits.items():
                 assert isinstance(val, (int, float))
 
-    def test_with_filter(self, test_db):
-        """Filter begrenser resultater korrekt."""
-        # Bare Norge → 6 aktive fra Norge (Ola, Kari, Erik, Morten, Vidar + Per sluttet)
-        result = run_analysis(
-            metric="count", group_by="avdeling",
-            filters={"arbeidsland": "Norge"},
-            db_path=test_db
-        )
-        total = sum(result["data"].values())
-        # Aktive i Norge: Ola, Kari, Erik, Morten, Vidar = 5
-        assert total == 5
-
     def test_count_active_vs_all(self, test_db):
         """active_only=False inkluderer sluttede ansatte."""
         active = run_analysis(
-            metric="count", group_by="kjonn", db_path=test_db
+            metric="count", group_by="alle", db_path=test_db
         )
         all_emps = run_analysis(
-            metric="count", group_by="kjonn",
+            metric="count", group_by="alle",
             active_only=False, db_path=test_db
         )
-        active_total = sum(active["data"].values())
-        all_total = sum(all_emps["data"].values())
-        assert all_total > active_total
+        assert all_emps["data"]["Alle"] > active["data"]["Alle"]
 
     def test_aldersgruppe_dimension(self, test_db):
         """Aldersgruppe-dimensjon returnerer beregnede grupper."""
@@ -316,7 +327,8 @@ class TestRunAnalysis:
         )
         # Filtrert total skal være <= total
         assert result_norge["data"]["Alle"] <= result_all["data"]["Alle"]
-        assert result_norge["data"]["Alle"] > 0
+        # Aktive i Norge: Ola, Kari, Erik, Morten, Vidar = 5
+        assert result_norge["data"]["Alle"] == 5
 
     def test_alle_avg_salary(self, test_db):
         """group_by='alle' fungerer med gjennomsnittslønn."""
@@ -379,19 +391,32 @@ class TestRunAnalysis:
         max_val = max_result["data"]["Alle"]
         assert min_val <= median_val <= max_val
 
+    def test_median_helper_odd_and_even(self):
+        """_median gir midterste verdi, eller snittet av de to midterste."""
+        assert _median([500000, 300000, 400000]) == 400000
+        assert _median([400000, 300000, 600000, 500000]) == 450000
+
     # --- Nye metrikker ---
 
-    def test_avg_tenure_by_avdeling(self, test_db):
-        """Snitt ansiennitet per avdeling returnerer tall i år."""
+    @pytest.mark.parametrize("metric,label,lower,upper", [
+        ("avg_tenure", "Snitt ansiennitet (år)", 0, None),
+        ("avg_work_hours", "Snitt arbeidstid (t/uke)", 1, None),
+        ("pct_female", "Andel kvinner (%)", 0, 100),
+        ("pct_leaders", "Andel ledere (%)", 0, 100),
+    ])
+    def test_metric_by_avdeling(self, test_db, metric, label, lower, upper):
+        """Metrikk per avdeling returnerer tall innenfor forventet område."""
         result = run_analysis(
-            metric="avg_tenure", group_by="avdeling", db_path=test_db
+            metric=metric, group_by="avdeling", db_path=test_db
         )
-        assert result["meta"]["metric_label"] == "Snitt ansiennitet (år)"
+        assert result["meta"]["metric_label"] == label
         data = result["data"]
         assert len(data) > 0
         for key, val in data.items():
             assert isinstance(val, (int, float))
-            assert val >= 0
+            assert val >= lower
+            if upper is not None:
+                assert val <= upper
 
     def test_avg_tenure_alle(self, test_db):
         """Snitt ansiennitet for alle returnerer én verdi."""
@@ -401,42 +426,6 @@ class TestRunAnalysis:
         assert "Alle" in result["data"]
         assert result["data"]["Alle"] > 0
 
-    def test_avg_work_hours_by_avdeling(self, test_db):
-        """Snitt arbeidstid per avdeling returnerer tall."""
-        result = run_analysis(
-            metric="avg_work_hours", group_by="avdeling", db_path=test_db
-        )
-        assert result["meta"]["metric_label"] == "Snitt arbeidstid (t/uke)"
-        data = result["data"]
-        assert len(data) > 0
-        for key, val in data.items():
-            assert isinstance(val, (int, float))
-            assert val > 0
-
-    def test_pct_female_by_avdeling(self, test_db):
-        """Andel kvinner per avdeling returnerer prosent."""
-        result = run_analysis(
-            metric="pct_female", group_by="avdeling", db_path=test_db
-        )
-        assert result["meta"]["metric_label"] == "Andel kvinner (%)"
-        data = result["data"]
-        assert len(data) > 0
-        for key, val in data.items():
-            assert isinstance(val, (int, float))
-            assert 0 <= val <= 100
-
-    def test_pct_leaders_by_avdeling(self, test_db):
-        """Andel ledere per avdeling returnerer prosent."""
-        result = run_analysis(
-            metric="pct_leaders", group_by="avdeling", db_path=test_db
-        )
-        assert result["meta"]["metric_label"] == "Andel ledere (%)"
-        data = result["data"]
-        assert len(data) > 0
-        for key, val in data.items():
-            assert isinstance(val, (int, float))
-            assert 0 <= val <= 100
-
     # --- Nye dimensjoner ---
 
     def test_tenure_gruppe_dimension(self, test_db):
@@ -484,29 +473,37 @@ class TestRunAnalysis:
 # get_filter_values
 # ===========================================================================
 
+@pytest.fixture(scope="module")
+def filter_values(module_db):
+    """Filterverdier for aktive ansatte, hentet én gang per modul."""
+    return get_filter_values(db_path=module_db, active_only=True)
+
+
+@pytest.fixture(scope="module")
+def filter_values_all(module_db):
+    """Filterverdier inkludert sluttede ansatte, hentet én gang per modul."""
+    return get_filter_values(db_path=module_db, active_only=False)
+
+
 class TestGetFilterValues:
     """Tester for get_filter_values()."""
 
-    def test_returns_all_filter_dimensions(self, test_db):
+    def test_returns_all_filter_dimensions(self, filter_values):
         """Returnerer verdier for alle filtrerbare dimensjoner."""
-        result = get_filter_values(db_path=test_db)
         for key in FILTERS:
-            assert key in result, f"Mangler filterdimensjon: {key}"
-            assert isinstance(result[key], list)
+            assert key in filter_values, f"Mangler filterdimensjon: {key}"
+            assert isinstance(filter_values[key], list)
 
-    def test_kjonn_values(self, test_db):
+    def test_kjonn_values(self, filter_values):
         """Kjønn-filter inneholder forventede verdier."""
-        result = get_filter_values(db_path=test_db)
-        assert "Mann" in result["kjonn"]
-        assert "Kvinne" in result["kjonn"]
+        assert "Mann" in filter_values["kjonn"]
+        assert "Kvinne" in filter_values["kjonn"]
 
-    def test_active_only_excludes_terminated(self, test_db):
+    def test_active_only_excludes_terminated(self, filter_values, filter_values_all):
         """active_only filtrerer bort sluttede ansattes verdier."""
-        active = get_filter_values(db_path=test_db, active_only=True)
-        all_vals = get_filter_values(db_path=test_db, active_only=False)
         # Alle unike verdier med active_only=False bør være >= active_only=True
         for key in FILTERS:
-            assert len(all_vals[key]) >= len(active[key])
+            assert len(filter_values_all[key]) >= len(filter_values[key])
 
 
 # ===========================================================================
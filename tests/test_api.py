@@ -3,69 +3,147 @@ API-tester for FastAPI-endepunktene.
 
 Bruker FastAPI TestClient med en midlertidig testdatabase,
 slik at testene kjører isolert uten å påvirke produksjonsdata.
+Lesende GET-tester går via httpx.AsyncClient direkte mot ASGI-appen.
 """
 
 import os
 import io
+import asyncio
+import functools
 import openpyxl
 from pathlib import Path
-from unittest.mock import patch
 from datetime import date
 
+import httpx
+import orjson
 import pytest
-from fastapi.testclient import TestClient
 
-from hr.database import init_database, get_connection, DEFAULT_DB_PATH
-from hr.analytics import HRAnalytics
-from tests.conftest import seed_employees
+from hr.database import get_connection, DEFAULT_DB_PATH
+from tests.conftest import copy_golden_db, use_app_db
+from web.routes.analyze import _cached_analysis
+
+# Async-testene (lesende GET-er) kjøres av anyio sin pytest-plugin
+pytestmark = pytest.mark.anyio
 
 
 # ---------------------------------------------------------------------------
 # Fixtures
 # ---------------------------------------------------------------------------
 
-@pytest.fixture
-def test_db(tmp_path):
-    """Opprett midlertidig testdatabase med kjente data."""
-    db_path = tmp_path / "test_api.db"
-    init_database(db_path)
-    seed_employees(db_path)
-    return db_path
+@pytest.fixture(scope="module")
+def client(app_client, memory_db):
+    """
+    Sesjonens delte TestClient (app-oppstart skjer én gang), pekt mot en
+    seedet minnedatabase slik at aggregeringene slipper disk-I/O.
+    Kun for lesende tester — bruk write_client for tester som endrer data.
+    """
+    app_client.cookies.clear()
+    with use_app_db(memory_db):
+        yield app_client
 
 
-@pytest.fixture
-def client(test_db):
-    """
-    FastAPI TestClient med testdatabase.
+@pytest.fixture(scope="module")
+def anyio_backend():
+    """Async-tester (anyio-plugin) kjører på asyncio, med uvloop når tilgjengelig."""
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        return "asyncio"
+    return ("asyncio", {"use_uvloop": True})
 
-    Patcher DEFAULT_DB_PATH slik at lifespan-funksjonen
-    (init_database + HRAnalytics) bruker testdatabasen.
-    Patcher også i import_routes (som viser DB-sti i /api/status).
+
+@pytest.fixture(scope="module")
+async def aclient(memory_db):
+    """
+    Delt httpx.AsyncClient direkte mot ASGI-appen (uten TestClient-portalen).
+    Brukes av de lesende GET-testene; samme minnedatabase som client.
     """
     import web.app as web_app_module
-    import web.routes.import_routes as import_routes_module
 
-    # Patch DEFAULT_DB_PATH OVERALT — inkludert i database-modulen
-    # som brukes av init_database() og HRAnalytics() i lifespan.
-    with patch("hr.database.DEFAULT_DB_PATH", test_db), \
-         patch.object(import_routes_module, "DEFAULT_DB_PATH", test_db):
+    with use_app_db(memory_db):
+        transport = httpx.ASGITransport(
+            app=web_app_module.app, raise_app_exceptions=False
+        )
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            yield ac
+
+
+@pytest.fixture(scope="module")
+def cached_get(aclient):
+    """
+    Async GET med respons-cache per URL for modulens delte (lesende) klient.
+    Gjentatte kall mot samme URL kjører ikke endepunktet på nytt.
+    """
+    responses = {}
+
+    async def get(url):
+        if url not in responses:
+            responses[url] = await aclient.get(url)
+        return responses[url]
+
+    return get
+
+
+@pytest.fixture(scope="module")
+def write_db(tmp_path_factory, golden_db):
+    """
+    Egen database for tester som endrer data (opplasting), delt i modulen.
+    Opplastingstestene sjekker bare valideringen av sin egen fil, som ikke
+    avhenger av hva som allerede ligger i databasen.
+    """
+    return copy_golden_db(
+        golden_db, tmp_path_factory.mktemp("api_write") / "test_api.db"
+    )
+
 
-        with TestClient(web_app_module.app, raise_server_exceptions=False) as c:
-            # Etter lifespan har kjørt, sørg for at analytics bruker testdatabasen
-            web_app_module.analytics = HRAnalytics(db_path=test_db)
-            yield c
+@pytest.fixture
+def write_client(app_client, write_db):
+    """
+    TestClient mot write_db. Funksjons-scope slik at DB-patchen er borte
+    igjen før de lesende testene kjører.
+    """
+    with use_app_db(write_db):
+        yield app_client
 
 
 # ---------------------------------------------------------------------------
 # Hjelpefunksjoner
 # ---------------------------------------------------------------------------
 
+# Nøkler som hver gruppe i lønnsfordelingene skal ha
+_SALARY_STAT_KEYS = frozenset(("gjennomsnitt", "min", "maks"))
+
+
+@functools.lru_cache(maxsize=8)
+def _make_excel(headers, rows=None):
+    """
+    Lag en minimal Excel-fil i minnet med gitt header-rad.
+    Argumentene må være tupler; resultatet caches siden openpyxl-lagring er treg.
+    """
+    # write_only strømmer rader rett til XML uten å bygge celleobjekter
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    # Row 1: category header (ignored by importer, which reads header=1)
+    ws.append(["Grunnleggende informasjon"] + [None] * (len(headers) - 1))
+    # Row 2: actual column headers
+    ws.append(list(headers))
+    # Row 3+: data rows
+    if rows:
+        for row in rows:
+            ws.append(list(row))
+    else:
+        ws.append([f"val{i}" for i in range(len(headers))])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
 def assert_json_ok(response, expected_status=200):
     """Verifiser at respons er gyldig JSON med riktig statuskode."""
     assert response.status_code == expected_status, (
         f"Forventet {expected_status}, fikk {response.status_code}: {response.text[:200]}"
     )
-    return response.json()
+    return orjson.loads(response.content)
 
 
 # ===========================================================================
@@ -75,8 +153,8 @@ def assert_json_ok(response, expected_status=200):
 class TestOverview:
     """Tester for /api/overview/* endepunkter."""
 
-    def test_summary(self, client):
-        data = assert_json_ok(client.get("/api/overview/summary"))
+    async def test_summary(self, cached_get):
+        data = assert_json_ok(await cached_get("/api/overview/summary"))
         assert "aktive" in data
         assert "nye_siste_3_mnd" in data
         assert "sluttede" in data
@@ -90,56 +168,11 @@ class TestOverview:
 class TestChurn:
     """Tester for /api/churn/* endepunkter."""
 
-    def test_calculate_total(self, client):
-        data = assert_json_ok(client.get(
-            "/api/churn/calculate?start_date=2024-01-01&end_date=2025-12-31"
-        ))
-        assert isinstance(data, dict)
-
-    def test_calculate_by_country(self, client):
-        data = assert_json_ok(client.get(
-            "/api/churn/calculate?start_date=2024-01-01&end_date=2025-12-31&by=country"
-        ))
-
-    def test_calculate_missing_params(self, client):
+    async def test_calculate_missing_params(self, cached_get):
         """Manglende obligatoriske parametere gir 422."""
-        resp = client.get("/api/churn/calculate")
+        resp = await cached_get("/api/churn/calculate")
         assert resp.status_code == 422
 
-    def test_monthly(self, client):
-        data = assert_json_ok(client.get("/api/churn/monthly?year=2025"))
-        assert isinstance(data, list)
-
-    def test_monthly_default_year(self, client):
-        """Uten year-parameter brukes inneværende år."""
-        data = assert_json_ok(client.get("/api/churn/monthly"))
-        assert isinstance(data, list)
-
-    def test_by_age(self, client):
-        data = assert_json_ok(client.get(
-            "/api/churn/by-age?start_date=2024-01-01&end_date=2025-12-31"
-        ))
-
-    def test_by_country(self, client):
-        data = assert_json_ok(client.get(
-            "/api/churn/by-country?start_date=2024-01-01&end_date=2025-12-31"
-        ))
-
-    def test_by_gender(self, client):
-        data = assert_json_ok(client.get(
-            "/api/churn/by-gender?start_date=2024-01-01&end_date=2025-12-31"
-        ))
-
-    def test_reasons(self, client):
-        data = assert_json_ok(client.get("/api/churn/reasons"))
-        assert isinstance(data, dict)
-
-    def test_reasons_with_dates(self, client):
-        data = assert_json_ok(client.get(
-            "/api/churn/reasons?start_date=2024-01-01&end_date=2025-12-31"
-        ))
-        assert isinstance(data, dict)
-
 
 # ===========================================================================
 # TENURE
@@ -148,43 +181,11 @@ class TestChurn:
 class TestTenure:
     """Tester for /api/tenure/* endepunkter."""
 
-    def test_average(self, client):
-        data = assert_json_ok(client.get("/api/tenure/average"))
+    async def test_average(self, cached_get):
+        data = assert_json_ok(await cached_get("/api/tenure/average"))
         assert "gjennomsnitt_ar" in data
         assert isinstance(data["gjennomsnitt_ar"], (int, float))
 
-    def test_distribution(self, client):
-        data = assert_json_ok(client.get("/api/tenure/distribution"))
-        assert isinstance(data, dict)
-
-
-# ===========================================================================
-# ANSETTELSESTYPE
-# ===========================================================================
-
-class TestEmployment:
-    """Tester for /api/employment/* endepunkter."""
-
-    def test_types(self, client):
-        data = assert_json_ok(client.get("/api/employment/types"))
-        assert isinstance(data, dict)
-
-    def test_fulltime_parttime(self, client):
-        data = assert_json_ok(client.get("/api/employment/fulltime-parttime"))
-        assert isinstance(data, dict)
-
-
-# ===========================================================================
-# LEDELSE
-# ===========================================================================
-
-class TestManagement:
-    """Tester for /api/management/* endepunkter."""
-
-    def test_ratio(self, client):
-        data = assert_json_ok(client.get("/api/management/ratio"))
-        assert isinstance(data, dict)
-
 
 # ===========================================================================
 # SØK
@@ -193,51 +194,34 @@ class TestManagement:
 class TestSearch:
     """Tester for /api/search endepunktet."""
 
-    def test_search_by_name(self, client):
-        data = assert_json_ok(client.get("/api/search?name=Ola"))
+    async def test_search_by_name(self, cached_get):
+        data = assert_json_ok(await cached_get("/api/search?name=Ola"))
         assert isinstance(data, list)
         assert len(data) >= 1
         # Ola Nordmann skal finnes
-        names = [f"{d.get('fornavn', '')} {d.get('etternavn', '')}" for d in data]
-        assert any("Ola" in n for n in names)
+        assert "Ola" in {d.get("fornavn") for d in data}
 
-    def test_search_by_department(self, client):
-        data = assert_json_ok(client.get("/api/search?department=Regnskap"))
+    async def test_search_by_department(self, cached_get):
+        data = assert_json_ok(await cached_get("/api/search?department=Regnskap"))
         assert isinstance(data, list)
         assert len(data) >= 1
 
-    def test_search_by_country(self, client):
-        data = assert_json_ok(client.get("/api/search?country=Danmark"))
+    async def test_search_by_country(self, cached_get):
+        data = assert_json_ok(await cached_get("/api/search?country=Danmark"))
         assert isinstance(data, list)
         assert len(data) >= 1
 
-    def test_search_no_results(self, client):
-        data = assert_json_ok(client.get("/api/search?name=Xyznonexistent"))
+    async def test_search_no_results(self, cached_get):
+        data = assert_json_ok(await cached_get("/api/search?name=Xyznonexistent"))
         assert isinstance(data, list)
         assert len(data) == 0
 
-    def test_search_with_limit(self, client):
-        data = assert_json_ok(client.get("/api/search?limit=2"))
+    async def test_search_with_limit(self, cached_get):
+        data = assert_json_ok(await cached_get("/api/search?limit=2"))
         assert isinstance(data, list)
         assert len(data) <= 2
 
 
-# ===========================================================================
-# PLANLAGTE AVGANGER
-# ===========================================================================
-
-class TestDepartures:
-    """Tester for /api/departures/* endepunkter."""
-
-    def test_planned(self, client):
-        data = assert_json_ok(client.get("/api/departures/planned"))
-        assert isinstance(data, list)
-
-    def test_planned_short_horizon(self, client):
-        data = assert_json_ok(client.get("/api/departures/planned?months_ahead=1"))
-        assert isinstance(data, list)
-
-
 # ===========================================================================
 # LØNN
 # ===========================================================================
@@ -245,47 +229,79 @@ class TestDepartures:
 class TestSalary:
     """Tester for /api/salary/* endepunkter."""
 
-    def test_summary(self, client):
-        data = assert_json_ok(client.get("/api/salary/summary"))
-        assert isinstance(data, dict)
-
-    def test_by_gender(self, client):
-        data = assert_json_ok(client.get("/api/salary/by-gender"))
-        assert isinstance(data, dict)
-
-    def test_by_department(self, client):
-        data = assert_json_ok(client.get("/api/salary/by-department"))
+    async def test_by_department(self, cached_get):
+        data = assert_json_ok(await cached_get("/api/salary/by-department"))
         assert isinstance(data, dict)
         # Alle verdier har gjennomsnitt, min, maks
         for key, val in data.items():
-            assert 'gjennomsnitt' in val
-            assert 'min' in val
-            assert 'maks' in val
+            assert _SALARY_STAT_KEYS.issubset(val), f"{key} mangler nøkler: {val}"
 
-    def test_by_country(self, client):
-        data = assert_json_ok(client.get("/api/salary/by-country"))
-        assert isinstance(data, dict)
+    @pytest.mark.parametrize("active_only", ["true", "false"])
+    async def test_bundle(self, cached_get, active_only):
+        """Bundle returnerer alle lønnsfordelinger i én respons."""
+        data = assert_json_ok(
+            await cached_get(f"/api/salary/bundle?active_only={active_only}")
+        )
+        assert set(data) == {
+            "summary", "by_gender", "by_department",
+            "by_country", "by_age", "by_job_family",
+        }
+        for key, val in data.items():
+            assert isinstance(val, dict), key
 
-    def test_by_age(self, client):
-        data = assert_json_ok(client.get("/api/salary/by-age"))
-        assert isinstance(data, dict)
+    async def test_bundle_matches_single_endpoints(self, cached_get):
+        """Bundle gir samme tall som de enkelte endepunktene."""
+        bundle = assert_json_ok(await cached_get("/api/salary/bundle"))
+        by_dept = assert_json_ok(await cached_get("/api/salary/by-department"))
+        assert bundle["by_department"] == by_dept
 
-    def test_by_job_family(self, client):
-        data = assert_json_ok(client.get("/api/salary/by-job-family"))
-        assert isinstance(data, dict)
 
-    @pytest.mark.parametrize("endpoint", [
-        "/api/salary/summary",
-        "/api/salary/by-gender",
-        "/api/salary/by-department",
-        "/api/salary/by-country",
-        "/api/salary/by-age",
-        "/api/salary/by-job-family",
-    ])
-    def test_salary_active_only_false(self, client, endpoint):
-        """Alle lønnsendepunkter aksepterer active_only=false."""
-        data = assert_json_ok(client.get(f"{endpoint}?active_only=false"))
-        assert isinstance(data, dict)
+# ===========================================================================
+# RØYKTEST — enkle lesende GET-er
+# ===========================================================================
+
+_PERIOD = "start_date=2024-01-01&end_date=2025-12-31"
+
+# (URL, forventet JSON-type) for endepunkter som bare sjekkes for form
+SMOKE = [
+    (f"/api/churn/calculate?{_PERIOD}", dict),
+    (f"/api/churn/calculate?{_PERIOD}&by=country", dict),
+    ("/api/churn/monthly?year=2025", list),
+    ("/api/churn/monthly", list),
+    (f"/api/churn/by-age?{_PERIOD}", dict),
+    (f"/api/churn/by-country?{_PERIOD}", dict),
+    (f"/api/churn/by-gender?{_PERIOD}", dict),
+    ("/api/churn/reasons", dict),
+    (f"/api/churn/reasons?{_PERIOD}", dict),
+    ("/api/tenure/distribution", dict),
+    ("/api/employment/types", dict),
+    ("/api/employment/fulltime-parttime", dict),
+    ("/api/management/ratio", dict),
+    ("/api/departures/planned", list),
+    ("/api/departures/planned?months_ahead=1", list),
+    ("/api/salary/summary", dict),
+    ("/api/salary/by-gender", dict),
+    ("/api/salary/by-country", dict),
+    ("/api/salary/by-age", dict),
+    ("/api/salary/by-job-family", dict),
+]
+
+
+@pytest.fixture(scope="module")
+async def smoke_responses(aclient):
+    """Hent alle SMOKE-URLer samtidig, én gang per modul."""
+    urls = [url for url, _ in SMOKE]
+    responses = await asyncio.gather(*(aclient.get(url) for url in urls))
+    return dict(zip(urls, responses))
+
+
+class TestReadOnlySmoke:
+    """Røyktest for lesende endepunkter: status 200 og riktig JSON-type."""
+
+    @pytest.mark.parametrize("url,expected_type", SMOKE, ids=[url for url, _ in SMOKE])
+    async def test_endpoint(self, smoke_responses, url, expected_type):
+        data = assert_json_ok(smoke_responses[url])
+        assert isinstance(data, expected_type)
 
 
 # ===========================================================================
@@ -313,30 +329,11 @@ class TestImport:
         data = assert_json_ok(client.get("/api/import/history"))
         assert isinstance(data, list)
 
-    def _make_excel(self, headers, rows=None):
-        """Lag en minimal Excel-fil i minnet med gitt header-rad."""
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        # Row 1: category header (ignored by importer, which reads header=1)
-        ws.append(["Grunnleggende informasjon"] + [None] * (len(headers) - 1))
-        # Row 2: actual column headers
-        ws.append(headers)
-        # Row 3+: data rows
-        if rows:
-            for row in rows:
-                ws.append(row)
-        else:
-            ws.append([f"val{i}" for i in range(len(headers))])
-        buf = io.BytesIO()
-        wb.save(buf)
-        buf.seek(0)
-        return buf.getvalue()
-
-    def test_upload_returns_validation(self, client):
+    def test_upload_returns_validation(self, write_client):
         """Suksessfull import returnerer valideringsinfo."""
-        excel = self._make_excel(["Fornavn", "Etternavn", "Medarbeidernummer"],
-                                 [["Ola", "Nordmann", "TEST001"]])
-        resp = client.post(
+        excel = _make_excel(("Fornavn", "Etternavn", "Medarbeidernummer"),
+                            (("Ola", "Nordmann", "TEST001"),))
+        resp = write_client.post(
             "/api/import/upload",
             files={"file": ("test.xlsx", excel,
                             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
@@ -348,12 +345,12 @@ class TestImport:
         assert v["match_prosent"] > 0
         assert isinstance(v["manglende"], list)
 
-    def test_upload_partial_match_has_warnings(self, client):
+    def test_upload_partial_match_has_warnings(self, write_client):
         """Delvis match gir advarsler i respons."""
         # Only 2 of ~52 expected columns => very low match => warning
-        excel = self._make_excel(["Fornavn", "Etternavn"],
-                                 [["Ola", "Nordmann"]])
-        resp = client.post(
+        excel = _make_excel(("Fornavn", "Etternavn"),
+                            (("Ola", "Nordmann"),))
+        resp = write_client.post(
             "/api/import/upload",
             files={"file": ("partial.xlsx", excel,
                             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
@@ -363,6 +360,30 @@ class TestImport:
         assert len(data["advarsler"]) > 0
         assert data["validering"]["match_prosent"] < 50
 
+    def test_upload_invalidates_analyze_cache(self, write_client):
+        """Import endrer dataversjonen, så cachet analyse hentes på nytt."""
+        url = "/api/analyze?metric=count&group_by=alle&active_only=false"
+        before = assert_json_ok(write_client.get(url))["data"]["Alle"]
+        excel = _make_excel(("Fornavn", "Etternavn", "Medarbeidernummer"),
+                            (("Kari", "Cache", "CACHE001"),))
+        write_client.post(
+            "/api/import/upload",
+            files={"file": ("cache.xlsx", excel,
+                            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+        )
+        after = assert_json_ok(write_client.get(url))["data"]["Alle"]
+        assert after != before
+
+    def test_analyze_cache_sees_direct_db_writes(self, write_client, write_db):
+        """Cachen invalideres også av commits utenom API-et (f.eks. CLI-import)."""
+        url = "/api/analyze?metric=count&group_by=alle&active_only=false"
+        before = assert_json_ok(write_client.get(url))["data"]["Alle"]
+        conn = get_connection(write_db)
+        conn.execute("INSERT INTO ansatte (fornavn) VALUES ('Direkte')")
+        conn.commit()
+        conn.close()
+        assert assert_json_ok(write_client.get(url))["data"]["Alle"] == before + 1
+
 
 # ===========================================================================
 # STATUS
@@ -377,73 +398,142 @@ class TestStatus:
         assert "aktive_ansatte" in data
         assert data["aktive_ansatte"] == 8
 
+    @pytest.fixture
+    def admin_client(self, client):
+        """Modulens klient innlogget som admin (seed-bruker 1) for denne testen."""
+        client.cookies.set("user_id", "1", domain="testserver.local", path="/")
+        yield client
+        client.cookies.clear()
+
+    def test_perf_stats_requires_admin(self, client):
+        """/api/_perf er ikke tilgjengelig uten admin-innlogging."""
+        assert client.get("/api/_perf").status_code == 401
+
+    def test_perf_stats_per_route_template(self, admin_client):
+        """/api/_perf samler responstid per rutemal."""
+        admin_client.get("/api/status")
+        data = assert_json_ok(admin_client.get("/api/_perf"))
+        stats = data["GET /api/status"]
+        assert stats["antall"] >= 1
+        assert 0 <= stats["snitt_ms"] <= stats["maks_ms"]
+        assert stats["p95_ms"] <= stats["maks_ms"]
+
+    def test_perf_stats_groups_unmatched_paths(self, admin_client):
+        """Ukjente /api-stier gir ikke en ny nøkkel per URL."""
+        admin_client.get("/api/nope1")
+        admin_client.get("/api/nope2/abc")
+        data = assert_json_ok(admin_client.get("/api/_perf"))
+        assert "GET <unmatched>" in data
+        assert not any("nope" in key for key in data)
 
 # ===========================================================================
 # RAPPORT
 # ===========================================================================
 
+async def _stream_head(aclient, url, n=4):
+    """Strøm respons og les bare de første n bytene av kroppen."""
+    async with aclient.stream("GET", url) as resp:
+        head = b""
+        async for chunk in resp.aiter_bytes():
+            head += chunk
+            if len(head) >= n:
+                break
+        return resp, head[:n]
+
+
 class TestReport:
     """Tester for /api/report/* endepunkter."""
 
-    def test_pdf_generation(self, client):
+    async def test_pdf_generation(self, aclient):
         """Generer PDF-rapport og verifiser respons."""
-        resp = client.get("/api/report/pdf")
+        resp, head = await _stream_head(aclient, "/api/report/pdf")
         assert resp.status_code == 200
         assert resp.headers["content-type"] == "application/pdf"
         # PDF starter alltid med %PDF
-        assert resp.content[:4] == b"%PDF"
+        assert head == b"%PDF"
 
-    def test_pdf_with_year(self, client):
+    async def test_pdf_with_year(self, aclient):
         """Generer PDF med spesifikt år."""
-        resp = client.get("/api/report/pdf?year=2025")
+        resp, head = await _stream_head(aclient, "/api/report/pdf?year=2025")
         assert resp.status_code == 200
-        assert resp.content[:4] == b"%PDF"
+        assert head == b"%PDF"
 
 
 # ===========================================================================
 # FRONTEND
 # ===========================================================================
 
-class TestFrontend:
-    """Tester for frontend-servering."""
+# Statiske filer sjekkes med HEAD (StaticFiles svarer uten å lese filinnholdet);
+# hovedsiden og Swagger UI er rene GET-ruter og hentes med GET.
+FRONTEND_REQUESTS = [
+    ("GET", "/"),
+    ("HEAD", "/static/css/style.css"),
+    ("HEAD", "/static/js/app.js"),
+    ("HEAD", "/static/js/charts.js"),
+    ("HEAD", "/static/js/chart.min.js"),
+    ("GET", "/docs"),
+]
 
-    def test_index_page(self, client):
-        """Hovedsiden returnerer HTML."""
-        resp = client.get("/")
-        assert resp.status_code == 200
-        assert "text/html" in resp.headers["content-type"]
-        assert "HR Analyse" in resp.text
 
-    def test_static_css(self, client):
-        """CSS-filen er tilgjengelig."""
-        resp = client.get("/static/css/style.css")
-        assert resp.status_code == 200
+class TestFrontend:
+    """Tester for frontend-servering."""
 
-    def test_static_js_app(self, client):
-        """app.js er tilgjengelig."""
-        resp = client.get("/static/js/app.js")
-        assert resp.status_code == 200
+    async def test_frontend_assets(self):
+        """Hovedside, statiske filer og Swagger UI hentes samtidig."""
+        import web.app as web_app_module
 
-    def test_static_js_charts(self, client):
-        """charts.js er tilgjengelig."""
-        resp = client.get("/static/js/charts.js")
-        assert resp.status_code == 200
+        transport = httpx.ASGITransport(app=web_app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            responses = await asyncio.gather(
+                *(ac.request(method, url) for method, url in FRONTEND_REQUESTS)
+            )
 
-    def test_static_chartjs(self, client):
-        """Chart.js-biblioteket er tilgjengelig."""
-        resp = client.get("/static/js/chart.min.js")
-        assert resp.status_code == 200
+        for (method, url), resp in zip(FRONTEND_REQUESTS, responses):
+            assert resp.status_code == 200, f"{method} {url} ga {resp.status_code}"
 
-    def test_swagger_docs(self, client):
-        """Swagger UI er tilgjengelig."""
-        resp = client.get("/docs")
-        assert resp.status_code == 200
+        index = responses[0]
+        assert "text/html" in index.headers["content-type"]
+        assert "HR Analyse" in index.text
 
 
 # ===========================================================================
 # ACTIVE_ONLY-PARAMETER
 # ===========================================================================
 
+ACTIVE_ONLY_ENDPOINTS = [
+    "/api/tenure/average",
+    "/api/tenure/distribution",
+    "/api/employment/types",
+    "/api/employment/fulltime-parttime",
+    "/api/management/ratio",
+    "/api/salary/summary",
+    "/api/salary/by-gender",
+    "/api/salary/by-department",
+    "/api/salary/by-country",
+    "/api/salary/by-age",
+    "/api/salary/by-job-family",
+]
+
+
+@pytest.fixture(scope="module")
+async def active_only_responses(aclient):
+    """Hent alle endepunktene med active_only=false samtidig, én gang per modul."""
+    responses = await asyncio.gather(
+        *(aclient.get(f"{endpoint}?active_only=false") for endpoint in ACTIVE_ONLY_ENDPOINTS)
+    )
+    return dict(zip(ACTIVE_ONLY_ENDPOINTS, responses))
+
+
+class TestActiveOnlyParam:
+    """Verifiser at active_only-parameteren fungerer på tvers av endepunkter."""
+
+    @pytest.mark.parametrize("endpoint", ACTIVE_ONLY_ENDPOINTS)
+    async def test_active_only_false(self, active_only_responses, endpoint):
+        """Alle endepunkter med active_only aksepterer false."""
+        resp = active_only_responses[endpoint]
+        assert resp.status_code == 200, f"{endpoint} feilet: {resp.text[:200]}"
+
+
 # ===========================================================================
 # ANALYSE (Custom Analysis Builder)
 # ===========================================================================
@@ -490,43 +580,22 @@ class TestAnalyze:
         total = sum(data["data"].values())
         assert total > 0
 
-    def test_analyze_aldersgruppe(self, client):
-        """Aldersgruppe som dimensjon."""
-        data = assert_json_ok(client.get(
-            "/api/analyze?metric=count&group_by=aldersgruppe"
-        ))
-        valid_groups = {"Under 25", "25-34", "35-44", "45-54", "55-64", "65+", "Ukjent"}
-        for group in data["data"].keys():
-            assert group in valid_groups
-
-    def test_analyze_invalid_metric(self, client):
-        """Ugyldig metrikk gir 400."""
-        resp = client.get("/api/analyze?metric=invalid&group_by=kjonn")
-        assert resp.status_code == 400
-        assert "Ugyldig metrikk" in resp.json()["detail"]
-
-    def test_analyze_invalid_group_by(self, client):
-        """Ugyldig gruppering gir 400."""
-        resp = client.get("/api/analyze?metric=count&group_by=invalid")
-        assert resp.status_code == 400
-        assert "Ugyldig gruppering" in resp.json()["detail"]
-
-    def test_analyze_invalid_split_by(self, client):
-        """Ugyldig inndeling gir 400."""
-        resp = client.get(
-            "/api/analyze?metric=count&group_by=kjonn&split_by=invalid"
-        )
-        assert resp.status_code == 400
-        assert "Ugyldig inndeling" in resp.json()["detail"]
-
-    def test_analyze_missing_required(self, client):
-        """Manglende obligatoriske params gir 422."""
-        resp = client.get("/api/analyze")
-        assert resp.status_code == 422
-
-    def test_analyze_options(self, client):
+    @pytest.mark.parametrize("query,expected_status,expected_msg", [
+        ("metric=invalid&group_by=kjonn", 400, "Ugyldig metrikk"),
+        ("metric=count&group_by=invalid", 400, "Ugyldig gruppering"),
+        ("metric=count&group_by=kjonn&split_by=invalid", 400, "Ugyldig inndeling"),
+        ("", 422, None),
+    ], ids=["metric", "group_by", "split_by", "missing_required"])
+    def test_analyze_invalid(self, client, query, expected_status, expected_msg):
+        """Ugyldige verdier gir 400 med forklaring; manglende params gir 422."""
+        resp = client.get(f"/api/analyze?{query}")
+        assert resp.status_code == expected_status
+        if expected_msg:
+            assert expected_msg in resp.json()["detail"]
+
+    async def test_analyze_options(self, cached_get):
         """Options-endepunkt returnerer forventet struktur."""
-        data = assert_json_ok(client.get("/api/analyze/options"))
+        data = assert_json_ok(await cached_get("/api/analyze/options"))
         assert "metrics" in data
         assert "dimensions" in data
         assert "filter_dimensions" in data
@@ -539,6 +608,30 @@ class TestAnalyze:
         assert isinstance(data["filter_values"], dict)
         assert "kjonn" in data["filter_values"]
 
+    def test_analyze_options_etag_revalidation(self, client):
+        """Options har ETag, og matchende If-None-Match gir 304 uten body."""
+        first = client.get("/api/analyze/options")
+        etag = first.headers["etag"]
+        # no-cache: nettleseren må revalidere, så nye importer vises straks
+        assert "no-cache" in first.headers["cache-control"]
+
+        revalidated = client.get(
+            "/api/analyze/options", headers={"If-None-Match": etag}
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+
+        other = client.get("/api/analyze/options?active_only=false")
+        assert other.headers["etag"] != etag
+
+    def test_analyze_repeat_hits_cache(self, client):
+        """Gjentatt identisk analyse besvares fra cachen."""
+        url = "/api/analyze?metric=avg_salary&group_by=avdeling&filter_kjonn=Mann,Kvinne"
+        first = assert_json_ok(client.get(url))
+        hits = _cached_analysis.cache_info().hits
+        assert assert_json_ok(client.get(url)) == first
+        assert _cached_analysis.cache_info().hits == hits + 1
+
     def test_analyze_active_only_false(self, client):
         """active_only=false inkluderer sluttede."""
         active = assert_json_ok(client.get(
@@ -570,9 +663,9 @@ class TestAnalyze:
         assert "Alle" in data["data"]
         assert data["data"]["Alle"] > 0
 
-    def test_analyze_options_includes_alle(self, client):
+    async def test_analyze_options_includes_alle(self, cached_get):
         """Options inkluderer 'alle' som siste dimensjon."""
-        data = assert_json_ok(client.get("/api/analyze/options"))
+        data = assert_json_ok(await cached_get("/api/analyze/options"))
         dims = data["dimensions"]
         assert dims[-1]["id"] == "alle"
         assert dims[-1]["label"] == "Alle (total)"
@@ -619,53 +712,35 @@ class TestAnalyze:
 
     # --- Nye dimensjoner ---
 
-    def test_analyze_tenure_gruppe(self, client):
-        """tenure_gruppe som dimensjon."""
-        data = assert_json_ok(client.get(
-            "/api/analyze?metric=count&group_by=tenure_gruppe"
-        ))
-        valid_groups = {"Under 1 år", "1-2 år", "2-5 år", "5-10 år", "Over 10 år", "Ukjent"}
-        for group in data["data"].keys():
-            assert group in valid_groups
-
-    def test_analyze_nasjonalitet(self, client):
-        """nasjonalitet som dimensjon."""
-        data = assert_json_ok(client.get(
-            "/api/analyze?metric=count&group_by=nasjonalitet"
-        ))
-        assert len(data["data"]) > 0
-
-    def test_analyze_ansettelsesniva(self, client):
-        """ansettelsesniva som dimensjon."""
-        data = assert_json_ok(client.get(
-            "/api/analyze?metric=count&group_by=ansettelsesniva"
-        ))
-        assert len(data["data"]) > 0
-
-    def test_analyze_arbeidssted(self, client):
-        """arbeidssted som dimensjon."""
+    @pytest.mark.parametrize("dim,valid_groups", [
+        ("aldersgruppe", {"Under 25", "25-34", "35-44", "45-54", "55-64", "65+", "Ukjent"}),
+        ("tenure_gruppe", {"Under 1 år", "1-2 år", "2-5 år", "5-10 år", "Over 10 år", "Ukjent"}),
+        ("nasjonalitet", None),
+        ("ansettelsesniva", None),
+        ("arbeidssted", None),
+    ])
+    def test_analyze_dimension(self, client, dim, valid_groups):
+        """Dimensjonen kan brukes som group_by; beregnede grupper har faste etiketter."""
         data = assert_json_ok(client.get(
-            "/api/analyze?metric=count&group_by=arbeidssted"
+            f"/api/analyze?metric=count&group_by={dim}"
         ))
         assert len(data["data"]) > 0
-
-    def test_analyze_options_includes_new_metrics(self, client):
-        """Options inkluderer nye metrikker."""
-        data = assert_json_ok(client.get("/api/analyze/options"))
-        metric_ids = [m["id"] for m in data["metrics"]]
-        assert "avg_tenure" in metric_ids
-        assert "avg_work_hours" in metric_ids
-        assert "pct_female" in metric_ids
-        assert "pct_leaders" in metric_ids
-
-    def test_analyze_options_includes_new_dimensions(self, client):
-        """Options inkluderer nye dimensjoner."""
-        data = assert_json_ok(client.get("/api/analyze/options"))
-        dim_ids = [d["id"] for d in data["dimensions"]]
-        assert "tenure_gruppe" in dim_ids
-        assert "ansettelsesniva" in dim_ids
-        assert "nasjonalitet" in dim_ids
-        assert "arbeidssted" in dim_ids
+        if valid_groups is not None:
+            assert set(data["data"]) <= valid_groups
+
+    @pytest.mark.parametrize("section,expected_ids", [
+        ("metrics", {"avg_tenure", "avg_work_hours", "pct_female", "pct_leaders"}),
+        ("dimensions", {"tenure_gruppe", "ansettelsesniva", "nasjonalitet", "arbeidssted",
+                        "divisjon", "rolle"}),
+        ("filter_dimensions", {"divisjon", "rolle"}),
+        ("filter_values", {"divisjon", "rolle"}),
+    ])
+    async def test_analyze_options_includes(self, cached_get, section, expected_ids):
+        """Options inkluderer nye metrikker, dimensjoner og filtre."""
+        data = assert_json_ok(await cached_get("/api/analyze/options"))
+        entries = data[section]
+        ids = set(entries) if isinstance(entries, dict) else {e["id"] for e in entries}
+        assert expected_ids <= ids
 
     def test_analyze_filter_nasjonalitet(self, client):
         """Filter på nasjonalitet fungerer."""
@@ -707,18 +782,6 @@ class TestAnalyze:
         # Aktive ledere: Kari, Lars
         assert data["data"]["Alle"] == 2
 
-    def test_analyze_options_includes_divisjon_rolle(self, client):
-        """Options-endepunkt inkluderer divisjon og rolle."""
-        data = assert_json_ok(client.get("/api/analyze/options"))
-        dim_ids = [d["id"] for d in data["dimensions"]]
-        filter_dim_ids = [d["id"] for d in data["filter_dimensions"]]
-        assert "divisjon" in dim_ids
-        assert "rolle" in dim_ids
-        assert "divisjon" in filter_dim_ids
-        assert "rolle" in filter_dim_ids
-        assert "divisjon" in data["filter_values"]
-        assert "rolle" in data["filter_values"]
-
     # ----- date_as_of snapshot tests -----
 
     def test_analyze_date_as_of_snapshot(self, client):
@@ -863,21 +926,3 @@ class TestMultiSelectFilters:
         dk_count = list(dk_data["data"].values())[0]
         combined_count = list(combined["data"].values())[0]
         assert combined_count == no_count + dk_count
-
-
-class TestActiveOnlyParam:
-    """Verifiser at active_only-parameteren fungerer på tvers av endepunkter."""
-
-    @pytest.mark.parametrize("endpoint", [
-        "/api/tenure/average",
-        "/api/tenure/distribution",
-        "/api/employment/types",
-        "/api/employment/fulltime-parttime",
-        "/api/management/ratio",
-        "/api/salary/summary",
-        "/api/salary/by-gender",
-    ])
-    def test_active_only_false(self, client, endpoint):
-        """Alle endepunkter med active_only aksepterer false."""
-        resp = client.get(f"{endpoint}?active_only=false")
-        assert resp.status_code == 200, f"{endpoint} feilet: {resp.text[:200]}"
@@ -5,14 +5,14 @@ Bruker FastAPI TestClient med midlertidig testdatabase.
 Seeded data inkluderer 1 admin-bruker og 4 standard-profiler.
 """
 
-from unittest.mock import patch
+import os
+import uuid
 
+import orjson
 import pytest
-from fastapi.testclient import TestClient
 
-from hr.database import init_database, get_connection, DEFAULT_DB_PATH
-from hr.analytics import HRAnalytics
-from tests.conftest import seed_employees
+from hr.database import get_connection, DEFAULT_DB_PATH
+from tests.conftest import copy_golden_db, memory_copy, read_pin, seed_pins, use_app_db
 
 
 # ---------------------------------------------------------------------------
@@ -20,68 +20,124 @@ from tests.conftest import seed_employees
 # ---------------------------------------------------------------------------
 
 @pytest.fixture
-def test_db(tmp_path):
-    """Opprett midlertidig testdatabase med kjente data."""
-    db_path = tmp_path / "test_dashboard.db"
-    init_database(db_path)
-    seed_employees(db_path)
-    return db_path
+def test_db(request, golden_db, tmp_path):
+    """
+    Egen testdatabase i minnet per test (kopi av sesjonens mal).
+    Tester merket @pytest.mark.readonly deler modulens skrivebeskyttede kopi.
+    TEST_DB_DISK=1 gir en vanlig fil i stedet, f.eks. for feilsøking i CI.
+    """
+    if request.node.get_closest_marker("readonly"):
+        yield request.getfixturevalue("readonly_db")
+        return
+    if os.environ.get("TEST_DB_DISK") == "1":
+        yield copy_golden_db(golden_db, tmp_path / "test_dashboard.db")
+        return
+    with memory_copy(golden_db, f"test_dashboard_{uuid.uuid4().hex}") as uri:
+        yield uri
 
 
 @pytest.fixture
-def client(test_db):
-    """FastAPI TestClient med testdatabase."""
-    import web.app as web_app_module
-    import web.routes.import_routes as import_routes_module
+def client(app_client, test_db):
+    """Sesjonens TestClient, pekt mot testens egen database og uten cookies."""
+    app_client.cookies.clear()
+    with use_app_db(test_db):
+        try:
+            yield app_client
+        finally:
+            app_client.cookies.clear()
+
+
+@pytest.fixture(scope="session")
+def seed_profile_ids(golden_db):
+    """{navn: id} for seed-profilene — like i alle kopier av malen."""
+    conn = get_connection(golden_db)
+    try:
+        rows = conn.execute("SELECT id, navn FROM dashboard_profiler").fetchall()
+    finally:
+        conn.close()
+    return {row["navn"]: row["id"] for row in rows}
+
+
+@pytest.fixture(scope="session")
+def seed_profile_pin_ids(golden_db):
+    """{profilnavn: [pin-id-er i sorteringsrekkefølge]} for seed-profilene."""
+    conn = get_connection(golden_db)
+    try:
+        rows = conn.execute(
+            "SELECT p.navn, pin.id FROM dashboard_pins pin "
+            "JOIN dashboard_profiler p ON p.id = pin.profil_id "
+            "ORDER BY pin.sortering, pin.id"
+        ).fetchall()
+    finally:
+        conn.close()
+    pin_ids: dict[str, list[int]] = {}
+    for row in rows:
+        pin_ids.setdefault(row["navn"], []).append(row["id"])
+    return pin_ids
 
-    with patch("hr.database.DEFAULT_DB_PATH", test_db), \
-         patch.object(import_routes_module, "DEFAULT_DB_PATH", test_db):
 
-        with TestClient(web_app_module.app, raise_server_exceptions=False) as c:
-            web_app_module.analytics = HRAnalytics(db_path=test_db)
-            yield c
+# Seed oppretter admin med id=1
+ADMIN_ID = 1
+
+
+def _login_as(client, user_id):
+    """
+    Sett innloggings-cookien direkte. Cookien er bare bruker-id-en, så en
+    ekte POST /api/auth/login (testet i TestAuth) er unødvendig for oppsett.
+    """
+    # Samme domene/sti som login-responsen gir, så logout kan slette den
+    client.cookies.set("user_id", str(user_id), domain="testserver.local", path="/")
+    return client
 
 
 @pytest.fixture
-def admin_client(client, test_db):
+def admin_client(client):
     """TestClient innlogget som admin (bruker-id 1 fra seed)."""
-    # Seed oppretter admin med id=1
-    resp = client.post("/api/auth/login", json={"user_id": 1})
-    assert resp.status_code == 200
-    # Cookies settes automatisk i TestClient
-    return client
+    return _login_as(client, ADMIN_ID)
+
+
+@pytest.fixture
+def make_user(test_db):
+    """
+    Fabrikk som legger inn en bruker direkte i testdatabasen og returnerer id-en.
+    Raskere enn POST /api/users når testen bare trenger en eksisterende bruker.
+    """
+    def _make(navn="Testbruker", epost=None, rolle="bruker"):
+        epost = epost or f"u{uuid.uuid4().hex[:8]}@ecit.no"
+        conn = get_connection(test_db)
+        try:
+            cursor = conn.execute(
+                "INSERT INTO brukere (navn, epost, rolle) VALUES (?, ?, ?)",
+                (navn, epost, rolle),
+            )
+            conn.commit()
+            return cursor.lastrowid
+        finally:
+            conn.close()
+    return _make
 
 
 @pytest.fixture
-def bruker_client(client, test_db):
+def bruker_client(client, make_user):
     """TestClient innlogget som vanlig bruker."""
-    # Opprett en vanlig bruker først (krever admin)
-    client.post("/api/auth/login", json={"user_id": 1})
-    resp = client.post("/api/users", json={
-        "navn": "Testbruker",
-        "epost": "test@ecit.no",
-        "rolle": "bruker",
-    })
-    assert resp.status_code == 201
-    bruker_id = resp.json()["id"]
-
-    # Logg ut admin, logg inn som bruker
-    client.post("/api/auth/logout")
-    resp = client.post("/api/auth/login", json={"user_id": bruker_id})
-    assert resp.status_code == 200
-    return client
+    return _login_as(client, make_user(epost="test@ecit.no"))
 
 
 # ---------------------------------------------------------------------------
 # Hjelpefunksjoner
 # ---------------------------------------------------------------------------
 
-def assert_json_ok(response, expected_status=200):
-    """Verifiser gyldig JSON med riktig statuskode."""
+def assert_status_ok(response, expected_status=200):
+    """Verifiser bare statuskoden — for kall der body-en ikke brukes."""
     assert response.status_code == expected_status, (
         f"Forventet {expected_status}, fikk {response.status_code}: {response.text[:300]}"
     )
-    return response.json()
+
+
+def assert_json_ok(response, expected_status=200):
+    """Verifiser gyldig JSON med riktig statuskode."""
+    assert_status_ok(response, expected_status)
+    return orjson.loads(response.content)
 
 
 # ===========================================================================
@@ -91,6 +147,7 @@ def assert_json_ok(response, expected_status=200):
 class TestUsers:
     """Tester for /api/users endepunkter."""
 
+    @pytest.mark.readonly
     def test_list_users(self, client):
         """Hent brukerliste (uautentisert OK — brukes til login-dropdown)."""
         data = assert_json_ok(client.get("/api/users"))
@@ -101,6 +158,7 @@ class TestUsers:
         assert admin["navn"] == "Admin"
         assert admin["rolle"] == "admin"
 
+    @pytest.mark.readonly
     def test_create_user_requires_admin(self, client):
         """Opprettelse uten innlogging gir 401."""
         resp = client.post("/api/users", json={
@@ -153,11 +211,7 @@ class TestUsers:
 class TestUpdateUser:
     """Tester for PUT /api/users/{id}."""
 
-    def _create_user(self, admin_client, navn="Testbruker", epost="test@ecit.no", rolle="bruker"):
-        resp = admin_client.post("/api/users", json={"navn": navn, "epost": epost, "rolle": rolle})
-        assert resp.status_code == 201
-        return resp.json()["id"]
-
+    @pytest.mark.readonly
     def test_update_requires_auth(self, client):
         """Oppdatering uten innlogging gir 401."""
         resp = client.put("/api/users/1", json={"navn": "Hacker"})
@@ -168,34 +222,31 @@ class TestUpdateUser:
         resp = bruker_client.put("/api/users/1", json={"navn": "Nope"})
         assert resp.status_code == 403
 
-    def test_update_navn(self, admin_client):
-        """Admin kan endre navn."""
-        uid = self._create_user(admin_client, epost="oppdater-navn@ecit.no")
-        data = assert_json_ok(admin_client.put(f"/api/users/{uid}", json={"navn": "Nytt Navn"}))
-        assert data["navn"] == "Nytt Navn"
-        assert data["epost"] == "oppdater-navn@ecit.no"
-
-    def test_update_epost(self, admin_client):
-        """Admin kan endre e-post."""
-        uid = self._create_user(admin_client, epost="gammel@ecit.no")
-        data = assert_json_ok(admin_client.put(f"/api/users/{uid}", json={"epost": "ny@ecit.no"}))
-        assert data["epost"] == "ny@ecit.no"
-
-    def test_update_rolle(self, admin_client):
-        """Admin kan endre rolle for andre brukere."""
-        uid = self._create_user(admin_client, epost="rolle-test@ecit.no")
-        data = assert_json_ok(admin_client.put(f"/api/users/{uid}", json={"rolle": "admin"}))
-        assert data["rolle"] == "admin"
-
-    def test_update_multiple_fields(self, admin_client):
-        """Flere felt kan oppdateres samtidig."""
-        uid = self._create_user(admin_client, epost="multi@ecit.no")
-        data = assert_json_ok(admin_client.put(f"/api/users/{uid}", json={
-            "navn": "Helt Ny",
-            "epost": "helt-ny@ecit.no",
-        }))
-        assert data["navn"] == "Helt Ny"
-        assert data["epost"] == "helt-ny@ecit.no"
+    @pytest.mark.parametrize("payload, expected", [
+        ({"navn": "Nytt Navn"}, {"navn": "Nytt Navn", "epost": "oppdater@ecit.no"}),
+        ({"epost": "ny@ecit.no"}, {"epost": "ny@ecit.no"}),
+        ({"rolle": "admin"}, {"rolle": "admin"}),
+        ({"navn": "Helt Ny", "epost": "helt-ny@ecit.no"},
+         {"navn": "Helt Ny", "epost": "helt-ny@ecit.no"}),
+    ], ids=["navn", "epost", "rolle", "flere_felt"])
+    def test_update_fields(self, admin_client, make_user, payload, expected):
+        """Admin kan endre navn, e-post og rolle for andre brukere, også samtidig."""
+        uid = make_user(epost="oppdater@ecit.no")
+        data = assert_json_ok(admin_client.put(f"/api/users/{uid}", json=payload))
+        for key, value in expected.items():
+            assert data[key] == value
+
+    @pytest.mark.parametrize("payload", [
+        {"rolle": "superadmin"},
+        {"navn": "  "},
+        {"epost": ""},
+        {},
+    ], ids=["ugyldig_rolle", "tomt_navn", "tom_epost", "ingen_felt"])
+    def test_update_invalid(self, admin_client, make_user, payload):
+        """Ugyldig rolle, tomt navn/e-post eller ingen felt gir 400."""
+        uid = make_user(epost="ugyldig@ecit.no")
+        resp = admin_client.put(f"/api/users/{uid}", json=payload)
+        assert resp.status_code == 400
 
     def test_update_self_role_blocked(self, admin_client):
         """Admin kan ikke endre sin egen rolle."""
@@ -208,48 +259,25 @@ class TestUpdateUser:
         data = assert_json_ok(admin_client.put("/api/users/1", json={"navn": "Super Admin"}))
         assert data["navn"] == "Super Admin"
 
-    def test_update_invalid_rolle(self, admin_client):
-        """Ugyldig rolle gir 400."""
-        uid = self._create_user(admin_client, epost="rolle-feil@ecit.no")
-        resp = admin_client.put(f"/api/users/{uid}", json={"rolle": "superadmin"})
-        assert resp.status_code == 400
-
-    def test_update_empty_navn(self, admin_client):
-        """Tomt navn gir 400."""
-        uid = self._create_user(admin_client, epost="tomt-navn@ecit.no")
-        resp = admin_client.put(f"/api/users/{uid}", json={"navn": "  "})
-        assert resp.status_code == 400
-
-    def test_update_empty_epost(self, admin_client):
-        """Tom e-post gir 400."""
-        uid = self._create_user(admin_client, epost="tom-epost@ecit.no")
-        resp = admin_client.put(f"/api/users/{uid}", json={"epost": ""})
-        assert resp.status_code == 400
-
-    def test_update_duplicate_epost(self, admin_client):
+    def test_update_duplicate_epost(self, admin_client, make_user):
         """Duplikat e-post gir 409."""
-        self._create_user(admin_client, epost="eksisterer@ecit.no")
-        uid2 = self._create_user(admin_client, epost="annen@ecit.no")
+        make_user(epost="eksisterer@ecit.no")
+        uid2 = make_user(epost="annen@ecit.no")
         resp = admin_client.put(f"/api/users/{uid2}", json={"epost": "eksisterer@ecit.no"})
         assert resp.status_code == 409
 
-    def test_update_same_epost_ok(self, admin_client):
+    def test_update_same_epost_ok(self, admin_client, make_user):
         """Å sende samme e-post som brukeren allerede har er OK (no-op)."""
-        uid = self._create_user(admin_client, epost="same@ecit.no")
+        uid = make_user(epost="same@ecit.no")
         data = assert_json_ok(admin_client.put(f"/api/users/{uid}", json={"epost": "same@ecit.no"}))
         assert data["epost"] == "same@ecit.no"
 
+    @pytest.mark.readonly
     def test_update_nonexistent_user(self, admin_client):
         """Oppdatering av ikke-eksisterende bruker gir 404."""
         resp = admin_client.put("/api/users/9999", json={"navn": "Ghost"})
         assert resp.status_code == 404
 
-    def test_update_no_fields(self, admin_client):
-        """Ingen felt å oppdatere gir 400."""
-        uid = self._create_user(admin_client, epost="nofields@ecit.no")
-        resp = admin_client.put(f"/api/users/{uid}", json={})
-        assert resp.status_code == 400
-
 
 # ===========================================================================
 # BRUKER-SLETTING (myk)
@@ -258,11 +286,7 @@ class TestUpdateUser:
 class TestDeleteUser:
     """Tester for DELETE /api/users/{id} (myk sletting)."""
 
-    def _create_user(self, admin_client, navn="Slett Meg", epost="slett@ecit.no"):
-        resp = admin_client.post("/api/users", json={"navn": navn, "epost": epost, "rolle": "bruker"})
-        assert resp.status_code == 201
-        return resp.json()["id"]
-
+    @pytest.mark.readonly
     def test_delete_requires_auth(self, client):
         """Sletting uten innlogging gir 401."""
         resp = client.delete("/api/users/1")
@@ -273,9 +297,9 @@ class TestDeleteUser:
         resp = bruker_client.delete("/api/users/1")
         assert resp.status_code == 403
 
-    def test_delete_success(self, admin_client):
+    def test_delete_success(self, admin_client, make_user):
         """Admin kan deaktivere en bruker."""
-        uid = self._create_user(admin_client)
+        uid = make_user(navn="Slett Meg", epost="slett@ecit.no")
         data = assert_json_ok(admin_client.delete(f"/api/users/{uid}"))
         assert data["ok"] is True
         assert "Slett Meg" in data["deaktivert"]
@@ -291,21 +315,22 @@ class TestDeleteUser:
         assert resp.status_code == 400
         assert "deg selv" in resp.json()["detail"].lower()
 
+    @pytest.mark.readonly
     def test_delete_nonexistent_user(self, admin_client):
         """Sletting av ikke-eksisterende bruker gir 404."""
         resp = admin_client.delete("/api/users/9999")
         assert resp.status_code == 404
 
-    def test_delete_already_deactivated(self, admin_client):
+    def test_delete_already_deactivated(self, admin_client, make_user):
         """Sletting av allerede deaktivert bruker gir 404."""
-        uid = self._create_user(admin_client, epost="dobbel-slett@ecit.no")
+        uid = make_user(epost="dobbel-slett@ecit.no")
         admin_client.delete(f"/api/users/{uid}")
         resp = admin_client.delete(f"/api/users/{uid}")
         assert resp.status_code == 404
 
-    def test_deactivated_user_cannot_login(self, client, admin_client):
+    def test_deactivated_user_cannot_login(self, client, admin_client, make_user):
         """Deaktivert bruker kan ikke logge inn."""
-        uid = self._create_user(admin_client, epost="no-login@ecit.no")
+        uid = make_user(epost="no-login@ecit.no")
         admin_client.delete(f"/api/users/{uid}")
 
         # Logg ut admin
@@ -319,8 +344,8 @@ class TestDeleteUser:
 class TestAuth:
     """Tester for /api/auth/* endepunkter."""
 
-    def test_login_success(self, client):
-        """Vellykket innlogging returnerer brukerinfo og setter cookie."""
+    def test_login_me_logout_flow(self, client):
+        """Innlogging setter cookie, /me gir brukeren, utlogging gir 401 på /me."""
         resp = client.post("/api/auth/login", json={"user_id": 1})
         data = assert_json_ok(resp)
         assert data["navn"] == "Admin"
@@ -328,31 +353,27 @@ class TestAuth:
         # Cookie satt
         assert "user_id" in resp.cookies
 
+        data = assert_json_ok(client.get("/api/auth/me"))
+        assert data["navn"] == "Admin"
+        assert data["rolle"] == "admin"
+
+        assert_status_ok(client.post("/api/auth/logout"))
+        # Etter logout: /auth/me skal feile
+        resp = client.get("/api/auth/me")
+        assert resp.status_code == 401
+
+    @pytest.mark.readonly
     def test_login_nonexistent_user(self, client):
         """Innlogging med ukjent bruker-ID gir 404."""
         resp = client.post("/api/auth/login", json={"user_id": 9999})
         assert resp.status_code == 404
 
-    def test_me_authenticated(self, admin_client):
-        """/auth/me returnerer innlogget bruker."""
-        data = assert_json_ok(admin_client.get("/api/auth/me"))
-        assert data["navn"] == "Admin"
-        assert data["rolle"] == "admin"
-
+    @pytest.mark.readonly
     def test_me_unauthenticated(self, client):
         """/auth/me uten innlogging gir 401."""
         resp = client.get("/api/auth/me")
         assert resp.status_code == 401
 
-    def test_logout(self, admin_client):
-        """Utlogging fjerner cookie og påfølgende /me gir 401."""
-        resp = admin_client.post("/api/auth/logout")
-        assert_json_ok(resp)
-        # Etter logout: /auth/me skal feile
-        resp = admin_client.get("/api/auth/me")
-        assert resp.status_code == 401
-
-
 # ===========================================================================
 # DASHBOARD-PROFILER
 # ===========================================================================
@@ -360,11 +381,13 @@ class TestAuth:
 class TestProfiles:
     """Tester for /api/dashboard/profiles endepunkter."""
 
+    @pytest.mark.readonly
     def test_list_profiles_requires_auth(self, client):
         """Profilliste krever innlogging."""
         resp = client.get("/api/dashboard/profiles")
         assert resp.status_code == 401
 
+    @pytest.mark.readonly
     def test_list_profiles_includes_mine_grafer(self, admin_client):
         """Profilliste inneholder 'Mine grafer' pseudo-profil pluss seed-profiler."""
         data = assert_json_ok(admin_client.get("/api/dashboard/profiles"))
@@ -430,6 +453,7 @@ class TestProfiles:
         ))
         assert data["ok"] is True
 
+    @pytest.mark.readonly
     def test_update_nonexistent_profile(self, admin_client):
         """Oppdatering av ukjent profil gir 404."""
         resp = admin_client.put("/api/dashboard/profiles/9999", json={"navn": "X"})
@@ -481,6 +505,7 @@ class TestProfiles:
         ))
         assert len(pins) == 0
 
+    @pytest.mark.readonly
     def test_delete_nonexistent_profile(self, admin_client):
         """Sletting av ukjent profil gir 404."""
         resp = admin_client.delete("/api/dashboard/profiles/9999")
@@ -494,24 +519,23 @@ class TestProfiles:
 class TestPins:
     """Tester for /api/dashboard/pins endepunkter."""
 
+    @pytest.mark.readonly
     def test_list_pins_requires_auth(self, client):
         """Pins krever innlogging."""
         resp = client.get("/api/dashboard/pins")
         assert resp.status_code == 401
 
+    @pytest.mark.readonly
     def test_list_personal_pins_empty(self, admin_client):
         """Mine grafer er tomme til å begynne med."""
         data = assert_json_ok(admin_client.get("/api/dashboard/pins"))
         assert data == []
 
-    def test_list_seed_profile_pins(self, admin_client):
+    @pytest.mark.readonly
+    def test_list_seed_profile_pins(self, admin_client, seed_profile_ids):
         """Seed-profiler har pins."""
-        # Hent profiler for å finne HR-oversikt sin ID
-        profiles = assert_json_ok(admin_client.get("/api/dashboard/profiles"))
-        hr_profile = next(p for p in profiles if p["navn"] == "HR-oversikt")
-
         pins = assert_json_ok(admin_client.get(
-            f"/api/dashboard/pins?profile_id={hr_profile['id']}"
+            f"/api/dashboard/pins?profile_id={seed_profile_ids['HR-oversikt']}"
         ))
         assert len(pins) == 4  # 4 pins i HR-oversikt seed
         assert pins[0]["tittel"] == "Ansatte per land"
@@ -557,20 +581,17 @@ class TestPins:
         )
         assert data["tittel"] == "Snittlønn per kjønn"
 
-    def test_create_profile_pin_as_bruker_forbidden(self, bruker_client):
+    def test_create_profile_pin_as_bruker_forbidden(self, bruker_client, seed_profile_ids):
         """Vanlig bruker kan ikke legge til i profiler."""
-        # Hent en profil-ID fra seed
-        profiles = assert_json_ok(bruker_client.get("/api/dashboard/profiles"))
-        profile_id = next(p["id"] for p in profiles if p["id"] is not None)
-
         resp = bruker_client.post("/api/dashboard/pins", json={
-            "profile_id": profile_id,
+            "profile_id": seed_profile_ids["HR-oversikt"],
             "metric": "count",
             "group_by": "kjonn",
             "tittel": "Uautorisert pin",
         })
         assert resp.status_code == 403
 
+    @pytest.mark.readonly
     def test_create_pin_nonexistent_profile(self, admin_client):
         """Pin i ukjent profil gir 404."""
         resp = admin_client.post("/api/dashboard/pins", json={
@@ -581,30 +602,21 @@ class TestPins:
         })
         assert resp.status_code == 404
 
-    def test_duplicate_personal_pin_rejected(self, admin_client):
-        """Duplikat personlig pin gir 409."""
-        pin_data = {
-            "metric": "count",
-            "group_by": "kjonn",
-            "tittel": "Kjønnsfordeling",
-        }
-        assert_json_ok(admin_client.post("/api/dashboard/pins", json=pin_data), 201)
-        resp = admin_client.post("/api/dashboard/pins", json=pin_data)
-        assert resp.status_code == 409
-
-    def test_duplicate_profile_pin_rejected(self, admin_client):
-        """Duplikat profil-pin gir 409."""
-        profile = assert_json_ok(
-            admin_client.post("/api/dashboard/profiles", json={"navn": "Dup-pin-test"}),
-            expected_status=201,
-        )
+    @pytest.mark.parametrize("in_profile", [False, True], ids=["personal", "profile"])
+    def test_duplicate_pin_rejected(self, admin_client, in_profile):
+        """Duplikat pin (personlig eller i profil) gir 409."""
         pin_data = {
-            "profile_id": profile["id"],
             "metric": "count",
             "group_by": "avdeling",
             "tittel": "Test",
         }
-        assert_json_ok(admin_client.post("/api/dashboard/pins", json=pin_data), 201)
+        if in_profile:
+            profile = assert_json_ok(
+                admin_client.post("/api/dashboard/profiles", json={"navn": "Dup-pin-test"}),
+                expected_status=201,
+            )
+            pin_data["profile_id"] = profile["id"]
+        assert_status_ok(admin_client.post("/api/dashboard/pins", json=pin_data), 201)
         resp = admin_client.post("/api/dashboard/pins", json=pin_data)
         assert resp.status_code == 409
 
@@ -615,7 +627,7 @@ class TestPins:
             "group_by": "avdeling",
             "tittel": "Test",
         }
-        assert_json_ok(admin_client.post("/api/dashboard/pins", json={
+        assert_status_ok(admin_client.post("/api/dashboard/pins", json={
             **base, "filter_dim": "arbeidsland", "filter_val": "Norge",
         }), 201)
         resp = admin_client.post("/api/dashboard/pins", json={
@@ -635,8 +647,10 @@ class TestPins:
             }),
             expected_status=201,
         )
+        # Dekker også at list-endepunktet dekoder filters-JSON
         pins = assert_json_ok(admin_client.get("/api/dashboard/pins"))
-        pin = next(p for p in pins if p["id"] == data["id"])
+        assert [p["id"] for p in pins] == [data["id"]]
+        pin = pins[0]
         assert pin["filters"] == filters
 
     def test_pin_filters_duplicate_check(self, admin_client):
@@ -646,7 +660,7 @@ class TestPins:
             "group_by": "avdeling",
             "tittel": "Dup-test",
         }
-        assert_json_ok(admin_client.post("/api/dashboard/pins", json={
+        assert_status_ok(admin_client.post("/api/dashboard/pins", json={
             **base, "filters": {"arbeidsland": ["Norge"]},
         }), 201)
         resp = admin_client.post("/api/dashboard/pins", json={
@@ -654,7 +668,7 @@ class TestPins:
         })
         assert resp.status_code == 201
 
-    def test_pin_backward_compat_filter_dim_to_filters(self, admin_client):
+    def test_pin_backward_compat_filter_dim_to_filters(self, admin_client, test_db):
         """Pin med gammelt filter_dim/filter_val får filters bygget automatisk."""
         data = assert_json_ok(
             admin_client.post("/api/dashboard/pins", json={
@@ -666,11 +680,10 @@ class TestPins:
             }),
             expected_status=201,
         )
-        pins = assert_json_ok(admin_client.get("/api/dashboard/pins"))
-        pin = next(p for p in pins if p["id"] == data["id"])
+        pin = read_pin(test_db, data["id"])
         assert pin["filters"] == {"arbeidsland": ["Norge"]}
 
-    def test_create_pin_with_split_by(self, admin_client):
+    def test_create_pin_with_split_by(self, admin_client, test_db):
         """Pin med split_by lagres korrekt."""
         data = assert_json_ok(
             admin_client.post("/api/dashboard/pins", json={
@@ -682,8 +695,7 @@ class TestPins:
             }),
             expected_status=201,
         )
-        pins = assert_json_ok(admin_client.get("/api/dashboard/pins"))
-        pin = next(p for p in pins if p["id"] == data["id"])
+        pin = read_pin(test_db, data["id"])
         assert pin["split_by"] == "kjonn"
         assert pin["chart_type"] == "stacked"
 
@@ -699,7 +711,7 @@ class TestPins:
         )
         assert data["tittel"] == "Min graf"
 
-    def test_delete_personal_pin(self, admin_client):
+    def test_delete_personal_pin(self, admin_client, test_db):
         """Bruker kan fjerne egne pins."""
         create = assert_json_ok(
             admin_client.post("/api/dashboard/pins", json={
@@ -715,35 +727,23 @@ class TestPins:
         assert data["ok"] is True
 
         # Verifiser borte
-        pins = assert_json_ok(admin_client.get("/api/dashboard/pins"))
-        assert all(p["id"] != pin_id for p in pins)
+        assert read_pin(test_db, pin_id) is None
 
-    def test_delete_profile_pin_as_admin(self, admin_client):
+    def test_delete_profile_pin_as_admin(self, admin_client, seed_profile_pin_ids):
         """Admin kan fjerne profil-pins."""
-        profiles = assert_json_ok(admin_client.get("/api/dashboard/profiles"))
-        hr_profile = next(p for p in profiles if p["navn"] == "HR-oversikt")
-
-        pins = assert_json_ok(admin_client.get(
-            f"/api/dashboard/pins?profile_id={hr_profile['id']}"
-        ))
-        pin_id = pins[0]["id"]
+        pin_id = seed_profile_pin_ids["HR-oversikt"][0]
 
         data = assert_json_ok(admin_client.delete(f"/api/dashboard/pins/{pin_id}"))
         assert data["ok"] is True
 
-    def test_delete_profile_pin_as_bruker_forbidden(self, bruker_client):
+    def test_delete_profile_pin_as_bruker_forbidden(self, bruker_client, seed_profile_pin_ids):
         """Vanlig bruker kan ikke fjerne profil-pins."""
-        profiles = assert_json_ok(bruker_client.get("/api/dashboard/profiles"))
-        hr_profile = next(p for p in profiles if p["navn"] == "HR-oversikt")
-
-        pins = assert_json_ok(bruker_client.get(
-            f"/api/dashboard/pins?profile_id={hr_profile['id']}"
-        ))
-        pin_id = pins[0]["id"]
+        pin_id = seed_profile_pin_ids["HR-oversikt"][0]
 
         resp = bruker_client.delete(f"/api/dashboard/pins/{pin_id}")
         assert resp.status_code == 403
 
+    @pytest.mark.readonly
     def test_delete_nonexistent_pin(self, admin_client):
         """Sletting av ukjent pin gir 404."""
         resp = admin_client.delete("/api/dashboard/pins/9999")
@@ -770,20 +770,14 @@ class TestPins:
 class TestReorder:
     """Tester for /api/dashboard/pins/reorder."""
 
-    def test_reorder_pins(self, admin_client):
+    def test_reorder_pins(self, admin_client, test_db):
         """Endre rekkefølge på pins."""
-        # Opprett 3 pins
-        ids = []
-        for i in range(3):
-            resp = assert_json_ok(
-                admin_client.post("/api/dashboard/pins", json={
-                    "metric": "count",
-                    "group_by": ["kjonn", "avdeling", "arbeidsland"][i],
-                    "tittel": f"Reorder {i}",
-                }),
-                expected_status=201,
-            )
-            ids.append(resp["id"])
+        # Opprett 3 pins direkte i databasen — bare reorder testes via API
+        ids = seed_pins(test_db, user_id=ADMIN_ID, specs=[
+            {"metric": "count", "group_by": "kjonn"},
+            {"metric": "count", "group_by": "avdeling"},
+            {"metric": "count", "group_by": "arbeidsland"},
+        ])
 
         # Reverser rekkefølgen
         reversed_ids = list(reversed(ids))
@@ -851,6 +845,25 @@ class TestMigrateLocal:
         ))
         assert data["migrated"] == 0
 
+    def test_migrate_skips_duplicates_within_batch(self, admin_client):
+        """Samme pin to ganger i én migrering lagres bare én gang."""
+        pin = {"metric": "count", "group_by": "avdeling", "title": "Per avdeling"}
+        data = assert_json_ok(admin_client.post(
+            "/api/dashboard/pins/migrate-local",
+            json={"pins": [pin, dict(pin)]},
+        ))
+        assert data["migrated"] == 1
+
+    def test_migrate_legacy_filter_dim_not_duplicates(self, admin_client):
+        """Gamle pins som bare skiller seg på filter_val er ikke duplikater."""
+        pin = {"metric": "count", "group_by": "avdeling", "title": "Per avdeling",
+               "filter_dim": "arbeidsland"}
+        data = assert_json_ok(admin_client.post(
+            "/api/dashboard/pins/migrate-local",
+            json={"pins": [{**pin, "filter_val": "Norge"}, {**pin, "filter_val": "Danmark"}]},
+        ))
+        assert data["migrated"] == 2
+
     def test_migrate_skips_invalid(self, admin_client):
         """Pins uten metric/group_by hoppes over."""
         pins = [
@@ -864,6 +877,7 @@ class TestMigrateLocal:
         ))
         assert data["migrated"] == 1
 
+    @pytest.mark.readonly
     def test_migrate_requires_auth(self, client):
         """Migrering krever innlogging."""
         resp = client.post("/api/dashboard/pins/migrate-local", json={"pins": []})
@@ -893,20 +907,16 @@ class TestMigrateLocal:
 class TestRBAC:
     """Verifiser at rollebasert tilgangskontroll fungerer konsistent."""
 
-    def test_bruker_cannot_create_profiles(self, bruker_client):
-        resp = bruker_client.post("/api/dashboard/profiles", json={"navn": "Nope"})
-        assert resp.status_code == 403
-
-    def test_bruker_cannot_update_profiles(self, bruker_client):
-        profiles = assert_json_ok(bruker_client.get("/api/dashboard/profiles"))
-        pid = next(p["id"] for p in profiles if p["id"] is not None)
-        resp = bruker_client.put(f"/api/dashboard/profiles/{pid}", json={"navn": "Nope"})
-        assert resp.status_code == 403
-
-    def test_bruker_cannot_delete_profiles(self, bruker_client):
-        profiles = assert_json_ok(bruker_client.get("/api/dashboard/profiles"))
-        pid = next(p["id"] for p in profiles if p["id"] is not None)
-        resp = bruker_client.delete(f"/api/dashboard/profiles/{pid}")
+    @pytest.mark.parametrize("method, path", [
+        ("post", "/api/dashboard/profiles"),
+        ("put", "/api/dashboard/profiles/{pid}"),
+        ("delete", "/api/dashboard/profiles/{pid}"),
+    ], ids=["create", "update", "delete"])
+    def test_bruker_cannot_modify_profiles(self, bruker_client, seed_profile_ids, method, path):
+        """Vanlig bruker kan ikke opprette, endre eller slette profiler."""
+        url = path.format(pid=seed_profile_ids["HR-oversikt"])
+        kwargs = {} if method == "delete" else {"json": {"navn": "Nope"}}
+        resp = bruker_client.request(method.upper(), url, **kwargs)
         assert resp.status_code == 403
 
     def test_bruker_cannot_create_users(self, bruker_client):
@@ -949,11 +959,13 @@ class TestRBAC:
 class TestTemplates:
     """Tester for /api/dashboard/templates endepunkter."""
 
+    @pytest.mark.readonly
     def test_list_templates_requires_auth(self, client):
         """Henting av maler krever innlogging."""
         resp = client.get("/api/dashboard/templates")
         assert resp.status_code == 401
 
+    @pytest.mark.readonly
     def test_list_templates_empty(self, admin_client):
         """Tom liste for ny bruker."""
         data = assert_json_ok(admin_client.get("/api/dashboard/templates"))
@@ -1040,6 +1052,7 @@ class TestTemplates:
         templates = assert_json_ok(admin_client.get("/api/dashboard/templates"))
         assert all(t["navn"] != "Slett-test" for t in templates)
 
+    @pytest.mark.readonly
     def test_delete_nonexistent_template(self, admin_client):
         """Sletting av ikke-eksisterende mal gir 404."""
         resp = admin_client.delete("/api/dashboard/templates/99999")
@@ -1117,6 +1130,16 @@ class TestTemplates:
         )
         assert data["migrated"] == 0
 
+    def test_migrate_skips_duplicates_within_batch(self, admin_client):
+        """Samme malnavn to ganger i én batch migreres bare én gang."""
+        tmpl = {"name": "Dobbel", "metric": "count", "group_by": "kjonn"}
+        data = assert_json_ok(
+            admin_client.post("/api/dashboard/templates/migrate", json={
+                "templates": [tmpl, {**tmpl, "group_by": "avdeling"}],
+            }),
+        )
+        assert data["migrated"] == 1
+
 
 # ===========================================================================
 # ALDERSKATEGORIER (konfigurerbare)
@@ -1125,18 +1148,21 @@ class TestTemplates:
 class TestAgeCategories:
     """Tester for /api/age-categories endepunkter."""
 
+    @pytest.mark.readonly
     def test_list_age_categories_no_auth_required(self, client):
         """GET /age-categories er offentlig tilgjengelig."""
         data = assert_json_ok(client.get("/api/age-categories"))
         assert isinstance(data, list)
         assert len(data) == 6  # default seed
 
+    @pytest.mark.readonly
     def test_list_age_categories_returns_defaults(self, client):
         """Standard seed-kategorier returneres sortert."""
         data = assert_json_ok(client.get("/api/age-categories"))
         labels = [c["etikett"] for c in data]
         assert labels == ["Under 25", "25-34", "35-44", "45-54", "55-64", "65+"]
 
+    @pytest.mark.readonly
     def test_list_age_categories_has_expected_fields(self, client):
         """Hver kategori har id, min_alder, maks_alder, etikett, sortering."""
         data = assert_json_ok(client.get("/api/age-categories"))
@@ -1147,6 +1173,21 @@ class TestAgeCategories:
             assert "etikett" in cat
             assert "sortering" in cat
 
+    def test_list_age_categories_etag_revalidation(self, admin_client):
+        """Uendrede kategorier gir 304 på If-None-Match; PUT gir ny ETag."""
+        etag = admin_client.get("/api/age-categories").headers["etag"]
+        resp = admin_client.get("/api/age-categories", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+        assert_status_ok(admin_client.put("/api/age-categories", json={
+            "kategorier": [{"min_alder": 0, "maks_alder": 150, "etikett": "Alle"}]
+        }))
+        resp = admin_client.get("/api/age-categories", headers={"If-None-Match": etag})
+        data = assert_json_ok(resp)
+        assert resp.headers["etag"] != etag
+        assert [c["etikett"] for c in data] == ["Alle"]
+
+    @pytest.mark.readonly
     def test_update_requires_admin(self, client):
         """PUT /age-categories krever admin-rolle."""
         resp = client.put("/api/age-categories", json={
@@ -1186,49 +1227,30 @@ class TestAgeCategories:
             {"min_alder": 0, "maks_alder": 29, "etikett": "Under 30"},
             {"min_alder": 30, "maks_alder": 49, "etikett": "30-49"},
         ]
-        assert_json_ok(admin_client.put("/api/age-categories", json={
+        assert_status_ok(admin_client.put("/api/age-categories", json={
             "kategorier": new_cats,
         }))
         cats = assert_json_ok(admin_client.get("/api/age-categories"))
         mins = [c["min_alder"] for c in cats]
         assert mins == [0, 30, 50]
 
-    def test_update_rejects_empty_list(self, admin_client):
-        """Minst en kategori er pakrevd."""
-        resp = admin_client.put("/api/age-categories", json={"kategorier": []})
-        assert resp.status_code == 400
-
-    def test_update_rejects_empty_label(self, admin_client):
-        """Tom etikett er ikke tillatt."""
-        resp = admin_client.put("/api/age-categories", json={
-            "kategorier": [{"min_alder": 0, "maks_alder": 30, "etikett": "  "}]
-        })
-        assert resp.status_code == 400
-
-    def test_update_rejects_negative_min(self, admin_client):
-        """Negativ min_alder er ugyldig."""
-        resp = admin_client.put("/api/age-categories", json={
-            "kategorier": [{"min_alder": -1, "maks_alder": 30, "etikett": "Feil"}]
-        })
-        assert resp.status_code == 400
-
-    def test_update_rejects_min_greater_than_max(self, admin_client):
-        """min_alder > maks_alder er ugyldig."""
-        resp = admin_client.put("/api/age-categories", json={
-            "kategorier": [{"min_alder": 50, "maks_alder": 30, "etikett": "Feil"}]
-        })
-        assert resp.status_code == 400
-
-    def test_update_rejects_overlapping_categories(self, admin_client):
-        """Overlappende kategorier avvises."""
-        resp = admin_client.put("/api/age-categories", json={
-            "kategorier": [
-                {"min_alder": 0, "maks_alder": 34, "etikett": "Ung"},
-                {"min_alder": 30, "maks_alder": 60, "etikett": "Midt"},
-            ]
-        })
+    @pytest.mark.readonly
+    @pytest.mark.parametrize("kategorier, expected_detail", [
+        ([], None),
+        ([{"min_alder": 0, "maks_alder": 30, "etikett": "  "}], None),
+        ([{"min_alder": -1, "maks_alder": 30, "etikett": "Feil"}], None),
+        ([{"min_alder": 50, "maks_alder": 30, "etikett": "Feil"}], None),
+        ([
+            {"min_alder": 0, "maks_alder": 34, "etikett": "Ung"},
+            {"min_alder": 30, "maks_alder": 60, "etikett": "Midt"},
+        ], "overlapper"),
+    ], ids=["tom_liste", "tom_etikett", "negativ_min", "min_over_maks", "overlapp"])
+    def test_update_rejects(self, admin_client, kategorier, expected_detail):
+        """Ugyldige kategorier (tom liste, tom etikett, negativ/omvendt alder, overlapp) gir 400."""
+        resp = admin_client.put("/api/age-categories", json={"kategorier": kategorier})
         assert resp.status_code == 400
-        assert "overlapper" in resp.json()["detail"].lower()
+        if expected_detail:
+            assert expected_detail in resp.json()["detail"].lower()
 
     def test_update_allows_gaps(self, admin_client):
         """Kategorier med gap mellom seg er tillatt."""
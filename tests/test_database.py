@@ -5,7 +5,7 @@ from pathlib import Path
 
 import pytest
 
-from hr.database import init_database, reset_database, get_connection
+from hr.database import init_database, reset_database, get_connection, get_data_version
 
 
 class TestInitDatabase:
@@ -62,6 +62,14 @@ class TestInitDatabase:
         for idx_name in expected:
             assert idx_name in indexes, f"Missing index: {idx_name}"
 
+    def test_enables_wal_mode(self, tmp_path):
+        db_path = tmp_path / "test.db"
+        init_database(db_path)
+        conn = get_connection(db_path)
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+        assert mode == "wal"
+
     def test_idempotent(self, tmp_path):
         """Running init_database twice should not fail."""
         db_path = tmp_path / "test.db"
@@ -104,6 +112,20 @@ class TestGetConnection:
         assert conn.row_factory == sqlite3.Row
         conn.close()
 
+    def test_shared_memory_uri(self):
+        """A file: URI opens a shared in-memory database across connections."""
+        uri = "file:test_shared_memory_uri?mode=memory&cache=shared"
+        anchor = get_connection(uri)
+        init_database(uri)
+        conn = get_connection(uri)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='ansatte'"
+        )
+        assert cursor.fetchone() is not None
+        conn.close()
+        anchor.close()
+
 
 class TestResetDatabase:
     """Tests for reset_database()."""
@@ -193,3 +215,118 @@ class TestAlderskategorierSeed:
 
         assert rows[0]["min_alder"] == 0
         assert rows[-1]["maks_alder"] == 150
+
+
+class TestGetDataVersion:
+    """Tests for get_data_version()."""
+
+    def test_stable_without_changes(self, test_db):
+        assert get_data_version(test_db) == get_data_version(test_db)
+
+    def test_changes_on_insert(self, test_db):
+        before = get_data_version(test_db)
+        conn = get_connection(test_db)
+        conn.execute("INSERT INTO ansatte (fornavn) VALUES ('Ny')")
+        conn.commit()
+        conn.close()
+        assert get_data_version(test_db) != before
+
+
+class TestPinUniqueIndexes:
+    """Tests for the unique dashboard_pins indexes."""
+
+    def _new_profile(self, conn):
+        return conn.execute(
+            "INSERT INTO dashboard_profiler (slug, navn) VALUES ('test', 'Test')"
+        ).lastrowid
+
+    def _insert_pin(self, conn, bruker_id=None, profil_id=None, filters=None,
+                    filter_dim=None, filter_val=None):
+        return conn.execute(
+            "INSERT INTO dashboard_pins "
+            "(bruker_id, profil_id, metric, group_by, filters, filter_dim, filter_val, tittel) "
+            "VALUES (?, ?, 'count', 'kjonn', ?, ?, ?, 'Pin')",
+            (bruker_id, profil_id, filters, filter_dim, filter_val),
+        ).lastrowid
+
+    def test_rejects_duplicate_personal_pin(self, tmp_path):
+        db_path = tmp_path / "test.db"
+        init_database(db_path)
+        conn = get_connection(db_path)
+        self._insert_pin(conn, bruker_id=1)
+        with pytest.raises(sqlite3.IntegrityError):
+            self._insert_pin(conn, bruker_id=1)
+        conn.close()
+
+    def test_rejects_duplicate_profile_pin(self, tmp_path):
+        db_path = tmp_path / "test.db"
+        init_database(db_path)
+        conn = get_connection(db_path)
+        profil_id = self._new_profile(conn)
+        self._insert_pin(conn, profil_id=profil_id)
+        with pytest.raises(sqlite3.IntegrityError):
+            self._insert_pin(conn, profil_id=profil_id)
+        conn.close()
+
+    def test_allows_different_filters_and_owners(self, tmp_path):
+        db_path = tmp_path / "test.db"
+        init_database(db_path)
+        conn = get_connection(db_path)
+        self._insert_pin(conn, bruker_id=1)
+        self._insert_pin(conn, bruker_id=1, filters='{"arbeidsland": ["Norge"]}')
+        self._insert_pin(conn, bruker_id=2)
+        self._insert_pin(conn, profil_id=self._new_profile(conn))
+        conn.close()
+
+    def _legacy_db(self, tmp_path):
+        """Database as it looked before the unique indexes existed."""
+        db_path = tmp_path / "test.db"
+        init_database(db_path)
+        conn = get_connection(db_path)
+        conn.execute("DROP INDEX ux_pins_personlig")
+        return db_path, conn
+
+    def _index_names(self, db_path):
+        conn = get_connection(db_path)
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        conn.close()
+        return names
+
+    def test_init_backfills_legacy_filters(self, tmp_path):
+        """Legacy pins differing only in filter_val are distinct and both survive."""
+        db_path, conn = self._legacy_db(tmp_path)
+        norge = self._insert_pin(conn, bruker_id=1, filter_dim="arbeidsland", filter_val="Norge")
+        danmark = self._insert_pin(conn, bruker_id=1, filter_dim="arbeidsland", filter_val="Danmark")
+        conn.commit()
+        conn.close()
+
+        init_database(db_path)
+
+        conn = get_connection(db_path)
+        rows = dict(conn.execute(
+            "SELECT id, filters FROM dashboard_pins WHERE bruker_id = 1"
+        ).fetchall())
+        conn.close()
+        assert rows == {
+            norge: '{"arbeidsland": ["Norge"]}',
+            danmark: '{"arbeidsland": ["Danmark"]}',
+        }
+        assert "ux_pins_personlig" in self._index_names(db_path)
+
+    def test_init_keeps_real_duplicates_and_skips_index(self, tmp_path, caplog):
+        """Real duplicates are logged, never deleted; the index is not created."""
+        db_path, conn = self._legacy_db(tmp_path)
+        self._insert_pin(conn, bruker_id=1)
+        self._insert_pin(conn, bruker_id=1)
+        conn.commit()
+        conn.close()
+
+        with caplog.at_level("ERROR", logger="hr.database"):
+            init_database(db_path)
+
+        conn = get_connection(db_path)
+        count = conn.execute("SELECT COUNT(*) FROM dashboard_pins WHERE bruker_id = 1").fetchone()[0]
+        conn.close()
+        assert count == 2
+        assert "ux_pins_personlig" not in self._index_names(db_path)
+        assert "duplikater" in caplog.text
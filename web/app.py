@@ -4,6 +4,9 @@ Tynt API-lag over eksisterende hr_database-pakke.
 """
 
 import os
+import logging
+import time
+from collections import deque
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -53,6 +56,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Responstid per API-rute — logger trege kall og samler tall til /api/_perf
+logger = logging.getLogger(__name__)
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "200"))
+_request_timings: dict[str, deque] = {}
+
+
+@app.middleware("http")
+async def time_api_requests(request: Request, call_next):
+    """Mål varigheten av hvert /api/*-kall."""
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+
+    start = time.perf_counter_ns()
+    response = await call_next(request)
+    elapsed_ms = (time.perf_counter_ns() - start) / 1_000_000
+
+    # Bruk rutemalen (f.eks. /api/dashboard/pins/{pin_id}) så tallene ikke sprer seg per id.
+    # Rutere er inkludert med prefix="/api", og route.path er da relativ til prefikset.
+    # Kall uten treff på en rute samles under én nøkkel, ellers vokser tabellen per URL.
+    route = request.scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        key = f"{request.method} <unmatched>"
+    else:
+        if not path.startswith("/api/"):
+            path = "/api" + path
+        key = f"{request.method} {path}"
+    _request_timings.setdefault(key, deque(maxlen=1000)).append(elapsed_ms)
+
+    if elapsed_ms > SLOW_REQUEST_MS:
+        logger.warning(
+            "Tregt kall: %s %.1f ms (status %s)", key, elapsed_ms, response.status_code
+        )
+    return response
+
+
 # Statiske filer og templates
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
@@ -62,7 +101,7 @@ from web.routes.analytics import router as analytics_router
 from web.routes.import_routes import router as import_router
 from web.routes.report import router as report_router
 from web.routes.analyze import router as analyze_router
-from web.routes.dashboard import router as dashboard_router
+from web.routes.dashboard import router as dashboard_router, _require_admin
 
 app.include_router(analytics_router, prefix="/api")
 app.include_router(import_router, prefix="/api")
@@ -71,6 +110,22 @@ app.include_router(analyze_router, prefix="/api")
 app.include_router(dashboard_router, prefix="/api")
 
 
+@app.get("/api/_perf")
+async def perf_stats(request: Request):
+    """Aggregert responstid per API-rute (siste 1000 kall per rute). Kun admin."""
+    _require_admin(request)
+    stats = {}
+    for key, samples in _request_timings.items():
+        ordered = sorted(samples)
+        stats[key] = {
+            "antall": len(ordered),
+            "snitt_ms": round(sum(ordered) / len(ordered), 2),
+            "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 2),
+            "maks_ms": round(ordered[-1], 2),
+        }
+    return stats
+
+
 @app.get("/")
 async def index(request: Request):
     """Server hovedsiden."""
@@ -176,3 +176,17 @@ async def salary_by_age(active_only: bool = Query(True)):
 async def salary_by_job_family(active_only: bool = Query(True)):
     """Lønn per jobbfamilie."""
     return get_analytics().salary_by_job_family(active_only=active_only)
+
+
+@router.get("/salary/bundle")
+async def salary_bundle(active_only: bool = Query(True)):
+    """Alle lønnsfordelinger i én respons (brukes av Lønn-fanen)."""
+    analytics = get_analytics()
+    return {
+        "summary": analytics.salary_summary(active_only=active_only),
+        "by_gender": analytics.salary_by_gender(active_only=active_only),
+        "by_department": analytics.salary_by_department(active_only=active_only),
+        "by_country": analytics.salary_by_country(active_only=active_only),
+        "by_age": analytics.salary_by_age(active_only=active_only),
+        "by_job_family": analytics.salary_by_job_family(active_only=active_only),
+    }
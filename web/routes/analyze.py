@@ -4,10 +4,17 @@ Lar brukeren kombinere metrikker, dimensjoner og filtre fritt.
 Støtter multivalg-filtre (kommaseparerte verdier) på alle dimensjoner.
 """
 
+import copy
+import functools
+import hashlib
+import sqlite3
+from datetime import date
 from typing import Optional, Union
 
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Response
 
+from hr import database
+from hr.database import get_data_version
 from hr.analyzer import (
     run_analysis, get_filter_values,
     METRICS, DIMENSIONS, FILTERS,
@@ -15,6 +22,58 @@ from hr.analyzer import (
 
 router = APIRouter()
 
+# Options endres bare ved import — klienten revaliderer alltid med ETag (billig 304)
+_OPTIONS_CACHE_CONTROL = "private, no-cache"
+
+
+@functools.lru_cache(maxsize=512)
+def _cached_analysis(
+    metric: str,
+    group_by: str,
+    split_by: Optional[str],
+    filter_items: tuple,
+    active_only: bool,
+    date_as_of: Optional[str],
+    db_key: str,
+    data_version: str,
+) -> dict:
+    """
+    Memoisert run_analysis. db_key og data_version er bare med i nøkkelen —
+    en commit fra en annen tilkobling endrer data_version, så gamle oppføringer
+    blir aldri truffet igjen. Resultatet deles; kalleren må kopiere det.
+    """
+    filters = {k: list(v) if isinstance(v, tuple) else v for k, v in filter_items}
+    return run_analysis(
+        metric=metric,
+        group_by=group_by,
+        split_by=split_by,
+        filters=filters or None,
+        active_only=active_only,
+        date_as_of=date_as_of,
+    )
+
+
+# Langlevd tilkobling brukt bare til PRAGMA data_version: verdien endres når en
+# annen tilkobling (import, kategori-PUT, CLI) har committet, uten at tabeller leses.
+_version_conn: Optional[tuple[str, sqlite3.Connection]] = None
+
+
+def _analysis_cache_version(db_key: str) -> str:
+    """
+    Billig versjonsnøkkel for analysecachen. Telleren gjelder bare for denne
+    tilkoblingen, så cachen tømmes når den åpnes på nytt (ny database).
+    Dagens dato er med fordi aktiv-status er datoavhengig.
+    """
+    global _version_conn
+    if _version_conn is None or _version_conn[0] != db_key:
+        if _version_conn is not None:
+            _version_conn[1].close()
+        conn = sqlite3.connect(db_key, uri=db_key.startswith("file:"), check_same_thread=False)
+        _version_conn = (db_key, conn)
+        _cached_analysis.cache_clear()
+    version = _version_conn[1].execute("PRAGMA data_version").fetchone()[0]
+    return f"{version}:{date.today().isoformat()}"
+
 
 def _parse_filter_value(value: Optional[str]) -> Optional[Union[str, list[str]]]:
     """Parse en filterverdi — kommaseparerte verdier blir en liste."""
@@ -46,7 +105,7 @@ async def analyze(
     filter_arbeidssted: Optional[str] = Query(None, description="Kommaseparert for flervalg"),
     filter_divisjon: Optional[str] = Query(None, description="Kommaseparert for flervalg"),
     filter_rolle: Optional[str] = Query(None, description="Kommaseparert for flervalg"),
-):
+) -> dict:
     """
     Generisk analyse-endepunkt.
     Kombinerer en metrikk med 1-2 dimensjoner og valgfrie filtre.
@@ -77,29 +136,43 @@ async def analyze(
         if parsed is not None:
             filters[key] = parsed
 
+    filter_items = tuple(sorted(
+        (k, tuple(v) if isinstance(v, list) else v) for k, v in filters.items()
+    ))
+    db_key = str(database.DEFAULT_DB_PATH)
     try:
-        result = run_analysis(
-            metric=metric,
-            group_by=group_by,
-            split_by=split_by,
-            filters=filters if filters else None,
-            active_only=active_only,
-            date_as_of=date_as_of,
-        )
-        return result
+        # Kopi, så en kaller som endrer svaret ikke forurenser cachen
+        return copy.deepcopy(_cached_analysis(
+            metric, group_by, split_by, filter_items, active_only, date_as_of,
+            db_key, _analysis_cache_version(db_key),
+        ))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/analyze/options")
 async def analyze_options(
+    request: Request,
+    response: Response,
     active_only: bool = Query(True),
     date_as_of: Optional[str] = Query(None, description="Snapshot-dato for filterverdier"),
 ):
     """
     Returnerer tilgjengelige metrikker, dimensjoner og unike filterverdier.
     Brukes til å populere dropdowns i frontend.
+
+    Svaret får en ETag basert på datatilstanden; matchende If-None-Match
+    gir 304 uten at filterverdiene hentes på nytt.
     """
+    version = f"{get_data_version()}:{active_only}:{date_as_of}"
+    etag = '"' + hashlib.blake2b(version.encode(), digest_size=8).hexdigest() + '"'
+    cache_headers = {"ETag": etag, "Cache-Control": _OPTIONS_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=cache_headers)
+    response.headers.update(cache_headers)
+
     try:
         filter_values = get_filter_values(
             active_only=active_only,
@@ -2,7 +2,9 @@
 API-ruter for dashboard-system: brukere, autentisering, profiler og pins.
 """
 
+import hashlib
 import json
+import sqlite3
 from datetime import datetime
 from typing import Optional
 
@@ -267,10 +269,27 @@ class AgeCategoryUpdate(BaseModel):
 
 
 @router.get("/age-categories")
-async def list_age_categories():
-    """Hent alle alderskategorier (sortert)."""
+async def list_age_categories(request: Request, response: Response):
+    """
+    Hent alle alderskategorier (sortert).
+
+    PUT erstatter alle rader, så MAX(id) (AUTOINCREMENT) øker ved hver endring
+    og gir en billig ETag; matchende If-None-Match gir 304 uten radoppslag.
+    """
     conn = get_connection()
     try:
+        antall, max_id = conn.execute(
+            "SELECT COUNT(*), MAX(id) FROM alderskategorier"
+        ).fetchone()
+        etag = '"' + hashlib.blake2b(f"{antall}:{max_id}".encode(), digest_size=8).hexdigest() + '"'
+        # no-cache: klienten må alltid revalidere, så endringer vises umiddelbart
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=cache_headers)
+        response.headers.update(cache_headers)
+
         rows = conn.execute(
             "SELECT id, min_alder, maks_alder, etikett, sortering "
             "FROM alderskategorier ORDER BY sortering"
@@ -618,35 +637,6 @@ async def create_pin(request: Request, body: PinCreate):
                     filter_dim = k
                     filter_val = vals[0]
 
-        # Duplikat-sjekk — bruk filters JSON for sammenligning
-        if bruker_id:
-            dup = conn.execute(
-                "SELECT id FROM dashboard_pins "
-                "WHERE bruker_id = ? AND profil_id IS NULL "
-                "AND metric = ? AND group_by = ? "
-                "AND COALESCE(split_by, '') = ? "
-                "AND COALESCE(filters, '') = ? "
-                "AND COALESCE(date_as_of, '') = ?",
-                (bruker_id, body.metric, body.group_by,
-                 body.split_by or "", filters_json or "",
-                 body.date_as_of or ""),
-            ).fetchone()
-        else:
-            dup = conn.execute(
-                "SELECT id FROM dashboard_pins "
-                "WHERE profil_id = ? "
-                "AND metric = ? AND group_by = ? "
-                "AND COALESCE(split_by, '') = ? "
-                "AND COALESCE(filters, '') = ? "
-                "AND COALESCE(date_as_of, '') = ?",
-                (profil_id, body.metric, body.group_by,
-                 body.split_by or "", filters_json or "",
-                 body.date_as_of or ""),
-            ).fetchone()
-
-        if dup:
-            raise HTTPException(status_code=409, detail="Denne grafen finnes allerede i valgt profil")
-
         # Finn høyeste sortering
         if bruker_id:
             max_sort = conn.execute(
@@ -660,15 +650,23 @@ async def create_pin(request: Request, body: PinCreate):
                 (profil_id,),
             ).fetchone()[0]
 
-        cursor = conn.execute(
-            "INSERT INTO dashboard_pins "
-            "(bruker_id, profil_id, metric, group_by, split_by, filter_dim, filter_val, "
-            "filters, date_as_of, chart_type, tittel, sortering) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (bruker_id, profil_id, body.metric, body.group_by,
-             body.split_by, filter_dim, filter_val,
-             filters_json, body.date_as_of, body.chart_type, body.tittel, max_sort + 1),
-        )
+        # Duplikater (samme filters-JSON m.m.) stoppes av de unike pin-indeksene
+        try:
+            cursor = conn.execute(
+                "INSERT INTO dashboard_pins "
+                "(bruker_id, profil_id, metric, group_by, split_by, filter_dim, filter_val, "
+                "filters, date_as_of, chart_type, tittel, sortering) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (bruker_id, profil_id, body.metric, body.group_by,
+                 body.split_by, filter_dim, filter_val,
+                 filters_json, body.date_as_of, body.chart_type, body.tittel, max_sort + 1),
+            )
+        except sqlite3.IntegrityError as e:
+            # Bare unik-brudd betyr duplikat; CHECK/FK-feil er ekte feil
+            if "UNIQUE constraint failed" not in str(e):
+                raise
+            raise HTTPException(status_code=409, detail="Denne grafen finnes allerede i valgt profil")
+
         conn.commit()
         return {"id": cursor.lastrowid, "tittel": body.tittel}
     finally:
@@ -734,7 +732,7 @@ async def migrate_local_pins(request: Request, body: MigrateLocalPins):
     user = _require_user(request)
     conn = get_connection()
     try:
-        migrated = 0
+        rows = []
         for idx, pin in enumerate(body.pins):
             metric = pin.get("metric")
             group_by = pin.get("group_by")
@@ -745,35 +743,29 @@ async def migrate_local_pins(request: Request, body: MigrateLocalPins):
 
             # Håndter både gammelt (filter_dim/filter_val) og nytt (filters) format
             pin_filters = pin.get("filters")
+            if not pin_filters and pin.get("filter_dim") and pin.get("filter_val"):
+                pin_filters = {pin["filter_dim"]: [pin["filter_val"]]}
             filters_json = json.dumps(pin_filters, ensure_ascii=False, sort_keys=True) if pin_filters else None
 
-            # Duplikat-sjekk — bruk filters JSON for nye, filter_dim/val for gamle
-            dup = conn.execute(
-                "SELECT id FROM dashboard_pins "
-                "WHERE bruker_id = ? AND profil_id IS NULL "
-                "AND metric = ? AND group_by = ? "
-                "AND COALESCE(split_by, '') = ? "
-                "AND COALESCE(filters, '') = ? "
-                "AND COALESCE(date_as_of, '') = ?",
-                (user["id"], metric, group_by,
-                 pin.get("split_by") or "", filters_json or "",
-                 pin.get("date_as_of") or ""),
-            ).fetchone()
-
-            if dup:
-                continue
-
-            conn.execute(
-                "INSERT INTO dashboard_pins "
-                "(bruker_id, metric, group_by, split_by, filter_dim, filter_val, "
-                "filters, date_as_of, chart_type, tittel, sortering) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (user["id"], metric, group_by,
-                 pin.get("split_by"), pin.get("filter_dim"), pin.get("filter_val"),
-                 filters_json, pin.get("date_as_of"),
-                 pin.get("chart_type"), tittel, idx),
-            )
-            migrated += 1
+            rows.append((
+                user["id"], metric, group_by,
+                pin.get("split_by"), pin.get("filter_dim"), pin.get("filter_val"),
+                filters_json, pin.get("date_as_of"),
+                pin.get("chart_type"), tittel, idx,
+            ))
+
+        # Duplikater — mot eksisterende pins og tidligere i samme batch —
+        # hoppes over av den unike indeksen; tell bare rader som faktisk ble satt inn
+        changes_before = conn.total_changes
+        conn.executemany(
+            "INSERT INTO dashboard_pins "
+            "(bruker_id, metric, group_by, split_by, filter_dim, filter_val, "
+            "filters, date_as_of, chart_type, tittel, sortering) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT DO NOTHING",
+            rows,
+        )
+        migrated = conn.total_changes - changes_before
 
         conn.commit()
         return {"migrated": migrated}
@@ -871,7 +863,7 @@ async def migrate_local_templates(request: Request, body: TemplateMigrate):
     user = _require_user(request)
     conn = get_connection()
     try:
-        migrated = 0
+        rows = []
         for tmpl in body.templates:
             navn = tmpl.get("name", "").strip()
             metric = tmpl.get("metric", "")
@@ -880,22 +872,18 @@ async def migrate_local_templates(request: Request, body: TemplateMigrate):
                 continue
 
             filters_json = json.dumps(tmpl["filters"]) if tmpl.get("filters") else None
+            rows.append((user["id"], navn, metric, group_by,
+                         tmpl.get("split_by"), filters_json, tmpl.get("chart_type")))
 
-            # Hopp over duplikater
-            existing = conn.execute(
-                "SELECT id FROM analyse_maler WHERE bruker_id = ? AND navn = ?",
-                (user["id"], navn),
-            ).fetchone()
-            if existing:
-                continue
-
-            conn.execute(
-                "INSERT INTO analyse_maler (bruker_id, navn, metric, group_by, split_by, filters, chart_type) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (user["id"], navn, metric, group_by,
-                 tmpl.get("split_by"), filters_json, tmpl.get("chart_type")),
-            )
-            migrated += 1
+        # Hopp over duplikater via UNIQUE(bruker_id, navn) — én batch i stedet for SELECT per mal
+        changes_before = conn.total_changes
+        conn.executemany(
+            "INSERT INTO analyse_maler (bruker_id, navn, metric, group_by, split_by, filters, chart_type) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT DO NOTHING",
+            rows,
+        )
+        migrated = conn.total_changes - changes_before
 
         conn.commit()
         return {"migrated": migrated}
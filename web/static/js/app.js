@@ -703,14 +703,11 @@ async function loadLonn() {
     const activeOnly = !includeInactive;
     const qs = `active_only=${activeOnly}`;
 
-    const [summary, byGender, byDept, byCountry, byAge, byJobFamily] = await Promise.all([
-        fetchData(`/api/salary/summary?${qs}`),
-        fetchData(`/api/salary/by-gender?${qs}`),
-        fetchData(`/api/salary/by-department?${qs}`),
-        fetchData(`/api/salary/by-country?${qs}`),
-        fetchData(`/api/salary/by-age?${qs}`),
-        fetchData(`/api/salary/by-job-family?${qs}`),
-    ]);
+    const bundle = await fetchData(`/api/salary/bundle?${qs}`) || {};
+    const {
+        summary, by_gender: byGender, by_department: byDept,
+        by_country: byCountry, by_age: byAge, by_job_family: byJobFamily,
+    } = bundle;
 
     if (summary && summary.antall_med_lonn > 0) {
         const cards = document.getElementById('salary-cards');